@@ -2,44 +2,15 @@
 
 from more_itertools import distinct_permutations
 
-def riordina(arr, i):
-    """Ruota l'array spostando i primi i elementi in coda."""
-    # i è l'indice appena 'usato'; dopo la delete, ruotiamo per riportare
-    # l'inizio dell'array subito dopo la posizione i
-    if i <= 0:
-        return arr
-    return arr[i:] + arr[:i]
+from regole import Regole, valutatore
 
-def gioca(p):
-    # p è una tupla (da distinct_permutations); la rendo mutabile
-    arr = list(p)
-    punt = 0
-    i = 0
-    miss = 0  # fallimenti consecutivi (il tuo "limit")
-
-    while arr and miss <= 4:
-        # se l'indice supera la lunghezza, fai wrap
-        if i >= len(arr):
-            i = 0
-
-        if arr[i] == i + 1:
-            punt += (i + 1)
-            del arr[i]
-            miss = 0
-            # ruota l'array come da tua idea originale (solo se i>0)
-            if i > 0 and arr:
-                arr = riordina(arr, i)
-            # dopo la rotazione, riparti dall'inizio
-            i = 0
-        else:
-            # nessun match: vai avanti e conta il fallimento
-            i = (i + 1) % len(arr) if arr else 0
-            miss += 1
-
-    return punt
+# Regole: soglia di 4 mancate consecutive, 4 copie per valore, rotazione dopo ogni presa.
+# gioca(p) è il valutatore compilato per queste regole (vedi regole.py)
+REGOLE = Regole(N=5, molteplicita=4, miss_set=4)
+gioca = valutatore(REGOLE)
 
 # --- ricerca della sequenza migliore ---
-base = [1]*4 + [2]*4 + [3]*4 + [4]*4 + [5]*4
+base = REGOLE.base
 miglior_seq = None
 punteggio = -1
 
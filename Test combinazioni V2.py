@@ -2,62 +2,33 @@
 #
 # Ricerca stocastica con hill-climbing per trovare una sequenza (multiset 1..6 con 4 copie ciascuno)
 # che massimizzi il punteggio del gioco. Struttura:
-# - gioca(): valuta una sequenza (simulazione del gioco)
+# - gioca(): valuta una sequenza (valutatore compilato da regole.py)
 # - mosse locali (swap, block-move): piccole modifiche della sequenza
 # - hill_climb(): prova molte mosse locali e tiene i miglioramenti
 # - ciclo di restart: riparte da molte permutazioni casuali finché raggiunge TARGET
 
 import random
 
-def riordina(arr, i):
-    """Ruota l'array spostando i primi i elementi in coda."""
-    # Se i <= 0 non serve ruotare (già allineato)
-    if i <= 0:
-        return arr
-    # Sposta il prefisso arr[:i] in fondo e porta in testa arr[i:]
-    return arr[i:] + arr[:i]
-
-def gioca(p):
-    # Valutatore del punteggio: data una sequenza p (tupla), simula la partita.
-    # Converte la tupla in lista (mutabile) perché usiamo 'del' e riordini.
-    arr = list(p)
-    punt = 0          # punteggio accumulato
-    i = 0             # indice logico corrente
-    miss = 0          # conteggio di fallimenti consecutivi (nessuna presa)
-
-    # Continua finché ci sono carte e non superi 5 mancate di fila (miss <= 5)
-    while arr and miss <= 5:
-        # Wrap-around dell'indice se oltre la fine
-        if i >= len(arr):
-            i = 0
-
-        # Condizione di presa: il valore della carta deve eguagliare i+1
-        if arr[i] == i + 1:
-            punt += (i + 1)   # aggiungi il valore (i+1) al punteggio
-            del arr[i]        # rimuovi la carta
-            miss = 0          # resetta i fallimenti
-            # Se hai preso a indice > 0, applica la rotazione come da regola
-            if i > 0 and arr:
-                arr = riordina(arr, i)
-            # Dopo una presa si riparte sempre dall'inizio (i=0)
-            i = 0
-        else:
-            # Avanza di una posizione in modalità circolare
-            i = (i + 1) % len(arr) if arr else 0
-            miss += 1         # incrementa il contatore di mancate
-
-    # Ritorna il punteggio totale conseguito con questa sequenza
-    return punt
+from regole import Regole, valutatore
+
+# Regole: si continua finché non si superano 5 mancate di fila (miss <= 5),
+# con rotazione dopo ogni presa; gioca(p) è il valutatore compilato per queste regole
+REGOLE = Regole(N=6, molteplicita=4, miss_set=5)
+gioca = valutatore(REGOLE)
 
 # --- mazzo base ---
 # Multiset con 4 copie di ciascun numero da 1 a 6 (totale 24 carte)
-base = [1]*4 + [2]*4 + [3]*4 + [4]*4 + [5]*4 + [6]*4
+base = REGOLE.base
 
 # --- PARAMETRI DELLA RICERCA (puoi regolarli) ---
 TARGET = 82        # Punteggio obiettivo: se raggiunto, interrompi la ricerca
 MAX_STARTS = 15000 # Numero di restart casuali (nuove permutazioni iniziali)
 HC_ITERS = 800     # Numero di passi di miglioramento locale per ogni restart
 SEED = 129546      # Seed per avere run ripetibili (metti None per casualità pura)
+HC_BATCH = 1       # >1: valuta i candidati a lotti con gioca_batch (NumPy)
+
+if HC_BATCH > 1:
+    from gioca_batch import miglior_candidato
 
 # Inizializzazione del generatore casuale (riproducibilità opzionale)
 if SEED is not None:
@@ -90,7 +61,7 @@ def block_move_local(t):
     lst[j:j] = block                    # inserisci il blocco
     return tuple(lst)
 
-def hill_climb(start, iters=HC_ITERS, target=TARGET):
+def hill_climb(start, iters=HC_ITERS, target=TARGET, batch=HC_BATCH):
     # Algoritmo di miglioramento locale:
     # - parte da 'start'
     # - prova 'iters' mosse locali
@@ -101,6 +72,9 @@ def hill_climb(start, iters=HC_ITERS, target=TARGET):
     if best_score >= target:
         return best, best_score
 
+    if batch > 1:
+        return hill_climb_batch(best, best_score, iters, target, batch)
+
     for _ in range(iters):
         # 50%: swap di due carte | 50%: sposta un blocco contiguo
         cand = swap_local(best) if random.random() < 0.5 else block_move_local(best)
@@ -114,6 +88,22 @@ def hill_climb(start, iters=HC_ITERS, target=TARGET):
     # Restituisce la miglior sequenza trovata e il relativo punteggio
     return best, best_score
 
+def hill_climb_batch(best, best_score, iters, target, batch):
+    # Modalità a lotti (come in V3): 'batch' candidati dalla stessa 'best', valutati
+    # insieme; si accetta il migliore se non peggiora (budget = valutazioni totali)
+    done = 0
+    while done < iters:
+        k = min(batch, iters - done)
+        cands = [swap_local(best) if random.random() < 0.5 else block_move_local(best)
+                 for _ in range(k)]
+        j, sc = miglior_candidato(cands, REGOLE.miss_set, REGOLE.rotazione)   # stesse regole di gioca()
+        done += k
+        if sc >= best_score:
+            best, best_score = cands[j], sc
+            if best_score >= target:
+                break
+    return best, best_score
+
 # --- Ricerca: multi-start + hill-climbing + early-stop ---
 miglior_seq = None   # migliore sequenza trovata globalmente
 punteggio = -1       # punteggio globale migliore (sentinella iniziale)
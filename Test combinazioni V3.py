@@ -23,10 +23,11 @@
 # - Genera molte permutazioni casuali del mazzo (restart).
 # - Per ogni sequenza iniziale, applica hill-climbing con mosse locali
 #   (swap e spostamento di blocchi) per migliorarla.
-# - Ogni processo mantiene il miglior punteggio locale trovato e lo
-#   comunica al master tramite una coda asincrona.
-# - Se un processo raggiunge il punteggio target, segnala lo stop agli
-#   altri tramite un evento condiviso (early-stop cooperativo).
+# - Ogni processo mantiene il miglior punteggio locale trovato e, se
+#   migliora quello globale, lo scrive in memoria condivisa e sveglia il
+#   master tramite un evento.
+# - Se un processo raggiunge il punteggio target, alza il flag di stop
+#   condiviso letto dagli altri a ogni restart (early-stop cooperativo).
 #
 # Parallelismo:
 # La ricerca è distribuita su più processi per sfruttare tutti i core
@@ -34,11 +35,35 @@
 # restart, aumentando la probabilità di trovare l’ottimo in tempi brevi.
 # Parametri configurabili:
 # - MISS_SET   : soglia massima di mancate consecutive
-# - TARGET     : punteggio obiettivo da raggiungere
+# - TARGET     : punteggio obiettivo da raggiungere (2N(N+1) - 2, dalle regole)
 # - MAX_STARTS : numero totale di restart da provare
 # - HC_ITERS   : passi di hill-climbing per restart
 # - SEED       : seme per la riproducibilità (None per random puro)
 # - N_PROCS    : numero di processi paralleli
+# - HC_BATCH   : candidati valutati insieme con gioca_batch (1 = uno alla volta)
+# - HC_INCREMENTALE : rivaluta i candidati dal primo checkpoint divergente
+# - HC_GUIDATO : mosse generate dalla traccia della partita (vedi mossa_guidata)
+# - HC_CACHE   : cache mazzo -> punteggio con hash di Zobrist (0 = spenta; solo hill_climb
+#                semplice e incrementale)
+# - HC_TAVOLA  : tavola di trasposizione sugli stati intermedi della partita (0 = spenta)
+# - ISOLE      : modello a isole (pool elite per processo + migrazione ad anello)
+# - HC_MODO    : ricerca locale dei restart: hill_climb, ricottura simulata o tabu
+# - SECONDARIO : criterio dalla fine della partita per distinguere mazzi di pari punteggio
+# - GENETICO   : ogni worker evolve una popolazione (crossover che conserva il
+#                multiset, selezione a torneo, mosse locali come mutazione),
+#                con lo stesso budget di valutazioni dei restart; non compatibile
+#                con checkpoint, archivio, risultati e metriche
+# - CHECKPOINT_DIR / ARCHIVIO : checkpoint per worker e archivio elite su disco
+#
+# Riga di comando:
+#   --checkpoint DIR : salva periodicamente lo stato dei worker in DIR
+#   --resume DIR     : riprende esattamente una run interrotta da DIR
+#   --archivio FILE  : parte dai mazzi dell'archivio elite e lo aggiorna a fine run
+#   --risultati FILE : accoda (punteggio, mazzo a 4 bit per carta) di ogni restart
+#                      a FILE (leggibile con mazzo_compatto.py)
+#   --metriche FILE  : strumentazione: contatori dei worker come flusso JSONL in FILE
+#                      e una riga di riepilogo ogni METRICHE_OGNI secondi
+#   --profila R      : profiler a campionamento sul worker R (stack in profilo_worker_R.txt)
 #
 # Output:
 # - Stampa i progressi ogni volta che viene trovato un nuovo best.
@@ -46,57 +71,143 @@
 # - Alla fine riporta la sequenza vincente e il punteggio ottenuto.
 # ================================================================
 
+import argparse
+import glob
+import os
 import random
 import multiprocessing as mp
-from math import ceil
+from collections import Counter, deque
+from math import ceil, exp
+from time import perf_counter
+
+from valutatore_incrementale import ValutatoreIncrementale
+from cache_zobrist import Zobrist, CacheLRU, CacheCondivisa
+from archivio_elite import (carica_archivio, carica_run, carica_worker, salva_archivio,
+                            salva_run, salva_worker, unisci_elite)
+from mazzo_compatto import ScrittoreMazzi
+from metriche import BLOCCO, SWAP, Campionatore, FlussoMetriche, Metriche
+from regole import Regole, valutatore
+from tavola_trasposizioni import TavolaTrasposizioni
 
 #REGOLE DELLA PARTITA
 
 MISS_SET= 4
+REGOLE = Regole(N=5, molteplicita=4, miss_set=MISS_SET)
 
-def riordina(arr, i):
-    #Ruota l'array spostando i primi i elementi in coda.
-    if i <= 0:
-        return arr
-    return arr[i:] + arr[:i]
+# gioca_compilato(p) è il valutatore compilato per REGOLE (vedi regole.py); è lui
+# che si sostituisce per cambiare valutatore (imposta_regole, tavola di trasposizione)
+gioca_compilato = valutatore(REGOLE)
 
-def gioca(p):
-    # p è una tupla; la rendo mutabile (posso sempre modificare la tupla durante un processo)
+def gioca(p, traccia=False):
+    # Punteggio di p; con traccia=True ritorna (punteggio, letture): vedi gioca_traccia
+    if traccia:
+        return gioca_traccia(p)
+    return gioca_compilato(p)
+
+def gioca_traccia(p):
+    # Stessa partita di gioca() (regole in REGOLE), ma accanto alle carte tiene la loro
+    # posizione nel mazzo iniziale e registra ogni lettura come (posizione originale,
+    # presa sì/no). Fra due prese si leggono solo le posizioni 0..min(n, W)-1: oltre,
+    # la scansione circolare ripete carte già lette.
+    W, rotazione = REGOLE.miss_set + 1, REGOLE.rotazione
     arr = list(p)
+    pos = list(range(len(p)))
+    letture = []
     punt = 0
-    i = 0
-    miss = 0  # fallimenti consecutivi
-
-    #Il gioco termina quando miss > i-1 (cioè arrivo a contare un numero superiore delle mie carte a disposizione)
-    while arr and miss <= MISS_SET:
-        if i >= len(arr):
-            i = 0
-
-        if arr[i] == i + 1:
-            punt += (i + 1)
-            del arr[i]
-            miss = 0
-            if i > 0 and arr:
-                arr = riordina(arr, i)
-            i = 0
+
+    while arr:
+        for k in range(min(len(arr), W)):
+            if arr[k] == k + 1:
+                letture.append((pos[k], True))
+                break
+            letture.append((pos[k], False))
+        else:
+            break
+        punt += k + 1
+        if rotazione:
+            arr, pos = arr[k + 1:] + arr[:k], pos[k + 1:] + pos[:k]
         else:
-            # Avanza l'indice di 1 posizione; se supera la lunghezza della lista, torna a 0 (scansione circolare).
-            # Se invece l'array è vuoto, resetta semplicemente l'indice a 0 per sicurezza.
-            i = (i + 1) % len(arr) if arr else 0
-            miss += 1
+            arr, pos = arr[:k] + arr[k + 1:], pos[:k] + pos[k + 1:]
 
-    return punt #Alla fine della giocatà ritorno il punteggio ottenuto
+    return punt, letture
 
 # --- mazzo base ---
-base = [1]*4 + [2]*4 + [3]*4 + [4]*4 + [5]*4 #costruzione del mazzo
+base = REGOLE.base #costruzione del mazzo
+
+def imposta_regole(regole):
+    # Cambia le regole della partita (mazzo base, soglia, target, valutatori compilati)
+    global REGOLE, MISS_SET, base, gioca_compilato, gioca_finale, TARGET, ZOBRIST
+    REGOLE = regole
+    MISS_SET = regole.miss_set
+    base = regole.base
+    gioca_compilato = valutatore(regole)
+    gioca_finale = valutatore(regole, finale=True)
+    TARGET = regole.massimo - 2
+    ZOBRIST = Zobrist(len(base), max(base)) if HC_CACHE else None
 
 
 # --- PARAMETRI DI RICERCA
-TARGET = 58         # fermati appena lo trovi
+TARGET = REGOLE.massimo - 2  # 2N(N+1) - 2: fermati appena lo trovi
 MAX_STARTS = 250000     # restart totali da suddividere fra i processi
 HC_ITERS = 7500      # passi di miglioramento locale per restart
 SEED = None         # Seed casuale (Tengo None se lo randomizzo ad ogni ciclo - consigliato)
 N_PROCS = max(1, mp.cpu_count() - 1)  # usa quasi tutti i core
+ATTESA_MASTER = 1.0     # secondi massimi fra due controlli del master sui worker
+HC_BATCH = 1        # >1: i candidati dell'hill climbing vengono valutati a lotti con NumPy
+HC_INCREMENTALE = True  # rigioca solo dal primo punto in cui il candidato diverge da 'best'
+HC_GUIDATO = False      # mosse guidate dalla traccia di gioca() (niente mosse a vuoto)
+P_FUOCO = 0.6           # probabilità che lo swap guidato parta dal punto di blocco
+ULTIME_PRESE = 3        # il punto di blocco comprende le letture delle ultime prese
+HC_CACHE = 0            # voci della cache dei punteggi per processo (0 = nessuna cache)
+HC_CACHE_CONDIVISA = False  # True: una sola tabella in memoria condivisa per tutti i worker
+HC_TAVOLA = 0           # voci della tavola di trasposizione per processo (0 = spenta). Sostituisce
+                        # gioca() e gioca_finale(): vale per ricottura, tabu e hill_climb semplice
+                        # (HC_INCREMENTALE = False, HC_GUIDATO = False, HC_BATCH = 1)
+TAVOLA_FILE = None      # tavola da cui ogni worker parte e in cui il master le riunisce a fine run
+
+# --- MODELLO A ISOLE (opzionale)
+ISOLE = False           # True: ogni processo è un'isola con il proprio pool elite
+ELITE_SIZE = 4          # mazzi tenuti nel pool elite di ogni isola
+MIGRAZIONE_OGNI = 20    # restart fra due migrazioni
+MIGRANTI = 2            # mazzi migliori inviati all'isola vicina ad ogni migrazione
+P_ELITE = 0.5           # probabilità di ripartire da un mazzo elite perturbato
+KICK = 3                # swap casuali applicati al mazzo elite prima del restart
+
+# --- RICOTTURA SIMULATA / TABU (alternative a hill_climb in ogni restart)
+HC_MODO = "hill_climb"  # "hill_climb", "ricottura" oppure "tabu"
+SECONDARIO = None       # None, "rimaste" (meno carte rimaste) o "blocco" (finestra finale
+                        # più vicina a una presa): rompe i pareggi fra punteggi uguali
+SCHEDULA = "geometrica" # nome in SCHEDULE oppure funzione (x, T0, T1) -> temperatura, x in [0, 1]
+TEMP_INIZIALE = 1.0     # temperatura all'inizio del restart (in punti di punteggio)
+TEMP_FINALE = 0.05      # temperatura alla fine del restart
+TABU_VICINI = 20        # candidati valutati a ogni passo della ricerca tabu
+TABU_DURATA = 50        # passi per cui un mazzo già visitato resta vietato
+
+# --- RICERCA GENETICA (alternativa ai restart di hill_climb)
+GENETICO = False        # True: ogni worker evolve una popolazione invece di fare restart
+POP_SIZE = 32           # individui per popolazione
+TORNEO = 3              # partecipanti a ogni torneo di selezione
+P_CROSSOVER = 0.9       # probabilità che un figlio nasca da crossover (altrimenti copia)
+P_MUTAZIONE = 0.8       # probabilità di applicare swap_local/block_move_local al figlio
+N_ELITE = 2             # migliori copiati senza modifiche nella generazione successiva
+HC_FIGLI = 1000         # passi di hill_climb applicati a ogni figlio (0 = GA puro)
+
+# --- CHECKPOINT E ARCHIVIO ELITE (opzionali, anche da riga di comando)
+CHECKPOINT_DIR = None   # cartella dei checkpoint (None = nessun checkpoint)
+CHECKPOINT_OGNI = 50    # restart fra due checkpoint di ogni worker
+ARCHIVIO = None         # archivio elite: punti di partenza dei restart, aggiornato a fine run
+ARCHIVIO_K = 32         # mazzi tenuti nell'archivio (e nei top-K locali di ogni worker)
+RISULTATI = None        # file append-only dei mazzi compatti di ogni restart (None = nessuno)
+
+# --- STRUMENTAZIONE (opzionale, anche da riga di comando)
+METRICHE = None         # file JSONL delle metriche (None = strumentazione spenta)
+METRICHE_OGNI = 5.0     # secondi fra due invii dei contatori e fra due righe di riepilogo
+PROFILA_WORKER = None   # indice del worker da campionare con il profiler (None = nessuno)
+PROFILO_INTERVALLO = 0.005  # secondi di CPU fra due campioni
+METRICHE_LOCALI = None  # contatori del processo (li imposta worker_search se attivi)
+
+# Chiavi di Zobrist (seme fisso: uguali in tutti i processi, serve alla cache condivisa)
+ZOBRIST = Zobrist(len(base), max(base)) if HC_CACHE else None
 
 if SEED is not None:
     random.seed(SEED) #Randomizza la sequenza in base al SEED
@@ -107,13 +218,15 @@ def random_perm(multiset):
     return tuple(b)    # Restituisce il risultato come tupla (immutabile), utile da passare a gioca().
 
 
-def swap_local(t):
+def swap_local(t, mossa=False):
     lst = list(t)                            # copia mutabile della tupla
     i, j = random.sample(range(len(lst)),2) #scegli due posizioni casuali diverse
     lst[i], lst[j] = lst[j], lst[i]          # scambia gli elementi
+    if mossa:                                # con mossa=True ritorna anche le posizioni toccate
+        return tuple(lst), (min(i, j), max(i, j))
     return tuple(lst)                        # torna a tupla (immutabile)
 
-def block_move_local(t):
+def block_move_local(t, mossa=False):
     lst = list(t)                            # copia mutabile della tupla
     L = random.randint(2, 5)                 # lunghezza del blocco da spostare
     i = random.randint(0, len(lst) - L)      # posizione di inizio del blocco
@@ -121,25 +234,111 @@ def block_move_local(t):
     del lst[i:i+L]                           # rimuove il blocco dalla lista
     j = random.randint(0, len(lst))          # nuova posizione di inserimento
     lst[j:j] = block                         # reinserisce il blocco
+    if mossa:                                # tratto modificato: da min(i, j) a max(i, j) + L - 1
+        return tuple(lst), (min(i, j), max(i, j) + L - 1)
     return tuple(lst)                        # torna a tupla (immutabile)
 
-def hill_climb(start, iters=HC_ITERS, target=TARGET):
+def punto_di_blocco(letture, ultime=ULTIME_PRESE):
+    # Posizioni originali lette dalle ultime 'ultime' prese fino alla fine della
+    # partita: è lì che la sequenza si è bloccata e che conviene intervenire
+    prese = [t for t, (_, presa) in enumerate(letture) if presa]
+    inizio = prese[-ultime] if len(prese) >= ultime else 0
+    return sorted({p for p, _ in letture[inizio:]})
+
+def mossa_guidata(t, lette, fuoco):
+    # Generatore di mosse costruito sulla traccia della sequenza corrente.
+    # Ritorna (candidato, tocca_lette, tipo di mossa SWAP/BLOCCO):
+    # - swap: almeno una delle due carte è in una posizione letta (spesso nel punto
+    #   di blocco) e i due valori sono diversi (lo swap di valori uguali non cambia nulla);
+    # - block move: se il blocco non tocca nessuna posizione letta il punteggio è per
+    #   forza lo stesso (tocca_lette = False) e non serve valutarlo.
+    n = len(t)
+    while True:
+        if random.random() < 0.7:
+            i = random.choice(fuoco) if random.random() < P_FUOCO else random.choice(lette)
+            j = random.randrange(n)
+            if t[i] == t[j]:
+                continue
+            lst = list(t)
+            lst[i], lst[j] = lst[j], lst[i]
+            return tuple(lst), True, SWAP
+        cand = block_move_local(t)
+        if cand != t:
+            return cand, any(cand[p] != t[p] for p in lette), BLOCCO
+
+def aggiorna_elite(elite, sc, seq, size=ELITE_SIZE):
+    # Inserisce (sc, seq) nel pool elite (ordinato per punteggio, senza doppioni)
+    if any(s == seq for _, s in elite):
+        return
+    elite.append((sc, seq))
+    elite.sort(key=lambda x: -x[0])
+    del elite[size:]
+
+def partenza(elite):
+    # Punto di partenza di un restart: un mazzo elite perturbato con qualche swap
+    # (con probabilità P_ELITE) oppure una permutazione casuale come sempre
+    if elite and random.random() < P_ELITE:
+        _, seq = random.choice(elite)
+        for _ in range(KICK):
+            seq = swap_local(seq)
+        return seq
+    return random_perm(base)
+
+def hill_climb(start, iters=HC_ITERS, target=TARGET, batch=HC_BATCH, cache=None):
     best = start                    # sequenza corrente migliore
     best_score = gioca(best)        # punteggio della sequenza iniziale
     if best_score >= target:        # se già ottimale, esci subito
         return best, best_score
 
+    if HC_MODO == "ricottura":
+        return ricottura(best, iters, target)
+    if HC_MODO == "tabu":
+        return ricerca_tabu(best, iters, target)
+    if batch > 1:
+        return hill_climb_batch(best, best_score, iters, target, batch)
+    if HC_GUIDATO:
+        return hill_climb_guidato(best, iters, target)
+    if HC_INCREMENTALE:
+        return hill_climb_incrementale(best, iters, target, cache)
+
+    m = METRICHE_LOCALI             # None se la strumentazione è spenta
+    # Con una cache, come in hill_climb_incrementale: hash di Zobrist aggiornato dalla mossa
+    if cache is not None:
+        h_best = ZOBRIST.hash(best)
+        cache.put(h_best, best_score)
     # Ciclo principale: prova per 'iters' volte a migliorare la sequenza
     for _ in range(iters):
+        if m is not None:
+            t0 = perf_counter()
         # Genera una nuova sequenza candidata a partire dalla migliore attuale:
         # - con probabilità 50% fa uno swap di due carte,
         # - con probabilità 50% sposta un piccolo blocco di carte.
-        cand = swap_local(best) if random.random() < 0.7 else block_move_local(best)
-        # Calcola il punteggio della sequenza candidata
-        sc = gioca(cand)
+        swap = random.random() < 0.7
+        if cache is None:
+            cand = swap_local(best) if swap else block_move_local(best)
+            if m is not None:
+                t1 = perf_counter()
+            # Calcola il punteggio della sequenza candidata
+            sc = gioca(cand)
+        else:
+            if swap:
+                cand, (lo, hi) = swap_local(best, mossa=True)
+            else:
+                cand, (lo, hi) = block_move_local(best, mossa=True)
+            if m is not None:
+                t1 = perf_counter()
+            h = ZOBRIST.aggiorna(h_best, best, cand, lo, hi)
+            sc = cache.get(h)
+            if sc is None:
+                sc = gioca(cand)
+                cache.put(h, sc)
+        if m is not None:
+            m.passo(SWAP if swap else BLOCCO, sc >= best_score, t1 - t0, perf_counter() - t1)
         # Se il punteggio è migliore o uguale a quello corrente, aggiorna la soluzione
         if sc >= best_score:
             best, best_score = cand, sc
+            if cache is not None:
+                h_best = h
             # Se abbiamo già raggiunto il punteggio target, interrompi subito la ricerca
             if best_score >= target:
                 break
@@ -147,11 +346,369 @@ def hill_climb(start, iters=HC_ITERS, target=TARGET):
     return best, best_score
 
 
+def hill_climb_incrementale(best, iters, target, cache=None):
+    # Stesse mosse e stesso criterio di accettazione di hill_climb, ma il
+    # valutatore riparte dal checkpoint della prima presa che legge una
+    # posizione modificata: punteggi (e quindi traiettoria) identici a gioca().
+    # Con una cache, l'hash di Zobrist del candidato si ricava da quello di
+    # 'best' aggiornando solo il tratto toccato dalla mossa.
+    val = ValutatoreIncrementale(best, MISS_SET, REGOLE.rotazione)
+    best_score = val.punteggio
+    if cache is not None:
+        h_best = ZOBRIST.hash(best)
+        cache.put(h_best, best_score)
+    m = METRICHE_LOCALI
+    for _ in range(iters):
+        if m is not None:
+            t0 = perf_counter()
+        swap = random.random() < 0.7
+        if cache is None:
+            cand = swap_local(best) if swap else block_move_local(best)
+            if m is not None:
+                t1 = perf_counter()
+            sc = val.valuta(cand)
+        else:
+            if swap:
+                cand, (lo, hi) = swap_local(best, mossa=True)
+            else:
+                cand, (lo, hi) = block_move_local(best, mossa=True)
+            if m is not None:
+                t1 = perf_counter()
+            h = ZOBRIST.aggiorna(h_best, best, cand, lo, hi)
+            sc = cache.get(h)
+            if sc is None:
+                sc = val.valuta(cand)
+                cache.put(h, sc)
+        if m is not None:
+            m.passo(SWAP if swap else BLOCCO, sc >= best_score, t1 - t0, perf_counter() - t1)
+        if sc >= best_score:
+            best, best_score = cand, sc
+            if cache is not None:
+                h_best = h
+            val.accetta(best)       # aggiorna i checkpoint dal punto di divergenza
+            if best_score >= target:
+                break
+    return best, best_score
+
+
+def hill_climb_guidato(best, iters, target):
+    # Hill climbing con mosse guidate dalla traccia della sequenza corrente:
+    # la traccia si ricalcola solo quando cambia una posizione letta.
+    val = ValutatoreIncrementale(best, MISS_SET, REGOLE.rotazione)
+    best_score = val.punteggio
+    _, letture = gioca(best, traccia=True)
+    lette = sorted({p for p, _ in letture})
+    fuoco = punto_di_blocco(letture, ULTIME_PRESE)
+    m = METRICHE_LOCALI
+    for _ in range(iters):
+        if m is not None:
+            t0 = perf_counter()
+        cand, tocca_lette, tipo = mossa_guidata(best, lette, fuoco)
+        if m is not None:
+            t1 = perf_counter()
+        if not tocca_lette:
+            # Mossa laterale garantita (cambiano solo carte mai lette): hill_climb
+            # l'accetterebbe comunque, la si applica senza valutarla
+            best = cand
+            val.accetta(best)
+            if m is not None:
+                m.passo(tipo, True, t1 - t0)
+            continue
+        sc = val.valuta(cand)
+        if m is not None:
+            m.passo(tipo, sc >= best_score, t1 - t0, perf_counter() - t1)
+        if sc >= best_score:
+            best, best_score = cand, sc
+            val.accetta(best)
+            if best_score >= target:
+                break
+            _, letture = gioca(best, traccia=True)
+            lette = sorted({p for p, _ in letture})
+            fuoco = punto_di_blocco(letture, ULTIME_PRESE)
+    return best, best_score
+
+
+def hill_climb_batch(best, best_score, iters, target, batch):
+    # Variante a lotti: da 'best' si generano 'batch' candidati con le stesse mosse
+    # locali, gioca_batch li valuta tutti in una chiamata e si accetta il migliore
+    # se non peggiora. Il budget 'iters' resta il numero totale di valutazioni.
+    # Import qui e non in testa: HC_BATCH può essere cambiato dopo l'import di V3
+    # (sweep.py, ricerca_rete.py) e numpy serve solo se i lotti sono attivi.
+    from gioca_batch import miglior_candidato
+    done = 0
+    m = METRICHE_LOCALI
+    while done < iters:
+        if m is not None:
+            t0 = perf_counter()
+        k = min(batch, iters - done)
+        tipi, cands = [], []
+        for _ in range(k):
+            swap = random.random() < 0.7
+            tipi.append(SWAP if swap else BLOCCO)
+            cands.append(swap_local(best) if swap else block_move_local(best))
+        if m is not None:
+            t1 = perf_counter()
+        j, sc = miglior_candidato(cands, MISS_SET, REGOLE.rotazione)
+        if m is not None:
+            m.lotto(tipi, j if sc >= best_score else None, t1 - t0, perf_counter() - t1)
+        done += k
+        if sc >= best_score:
+            best, best_score = cands[j], sc
+            if best_score >= target:
+                break
+    return best, best_score
+
+
+SCHEDULE = {
+    "geometrica": lambda x, T0, T1: T0 * (T1 / T0) ** x,
+    "lineare": lambda x, T0, T1: T0 + (T1 - T0) * x,
+    "iperbolica": lambda x, T0, T1: T0 / (1 + (T0 / T1 - 1) * x),
+    "nulla": lambda x, T0, T1: 0.0,     # solo mosse che non peggiorano: hill_climb col secondario
+}
+
+# Stesso punteggio di gioca(), ma ritorna anche le carte rimaste a fine partita
+gioca_finale = valutatore(REGOLE, finale=True)
+
+def fitness(p):
+    # (punteggio, punteggio + secondario) con il secondario in [0, 1): a parità di
+    # punteggio vince il mazzo che finisce "meglio", senza mai scavalcare un punto intero
+    sc, rimaste = gioca_finale(p)
+    if SECONDARIO == "rimaste":
+        return sc, sc + 1 - len(rimaste) / (len(p) + 1)
+    if SECONDARIO == "blocco":
+        # Distanza delle carte della finestra finale dal valore che farebbe presa
+        dist = sum(abs(v - k - 1) for k, v in enumerate(rimaste[:MISS_SET + 1]))
+        return sc, sc + 1 / (2 + dist)
+    return sc, sc
+
+def ricottura(cur, iters, target):
+    # Ricottura simulata: un peggioramento d della fitness viene accettato con
+    # probabilità exp(d / T), con T che scende secondo SCHEDULA lungo il restart
+    schedula = SCHEDULA if callable(SCHEDULA) else SCHEDULE[SCHEDULA]
+    sc_cur, f_cur = fitness(cur)
+    best, best_score, f_best = cur, sc_cur, f_cur
+    m = METRICHE_LOCALI
+    for t in range(iters):
+        if m is not None:
+            t0 = perf_counter()
+        T = schedula(t / iters, TEMP_INIZIALE, TEMP_FINALE)
+        swap = random.random() < 0.7
+        cand = swap_local(cur) if swap else block_move_local(cur)
+        if m is not None:
+            t1 = perf_counter()
+        sc, f = fitness(cand)
+        d = f - f_cur
+        accettata = d >= 0 or (T > 0 and random.random() < exp(d / T))
+        if m is not None:
+            m.passo(SWAP if swap else BLOCCO, accettata, t1 - t0, perf_counter() - t1)
+        if accettata:
+            cur, sc_cur, f_cur = cand, sc, f
+            if f > f_best:
+                best, best_score, f_best = cur, sc, f
+                if best_score >= target:
+                    break
+    return best, best_score
+
+def ricerca_tabu(cur, iters, target):
+    # Ricerca tabu: a ogni passo si valutano TABU_VICINI candidati e ci si sposta sul
+    # migliore non vietato, anche se peggiora. I mazzi visitati negli ultimi
+    # TABU_DURATA passi sono vietati: sul plateau la ricerca non torna indietro.
+    sc_cur, f_cur = fitness(cur)
+    best, best_score, f_best = cur, sc_cur, f_cur
+    vietati = {cur}
+    coda = deque([cur])
+    m = METRICHE_LOCALI
+    fatti = 0
+    while fatti < iters:
+        scelto = None
+        for _ in range(min(TABU_VICINI, iters - fatti)):
+            if m is not None:
+                t0 = perf_counter()
+            swap = random.random() < 0.7
+            cand = swap_local(cur) if swap else block_move_local(cur)
+            if m is not None:
+                t1 = perf_counter()
+            if cand in vietati:
+                if m is not None:
+                    m.passo(SWAP if swap else BLOCCO, False, t1 - t0)
+                continue
+            fatti += 1
+            sc, f = fitness(cand)
+            if m is not None:
+                m.passo(SWAP if swap else BLOCCO, scelto is None or f > scelto[2], t1 - t0,
+                        perf_counter() - t1)
+            if scelto is None or f > scelto[2]:
+                scelto = (cand, sc, f)
+        if scelto is None:
+            fatti += 1      # tutti i candidati vietati: il passo conta comunque
+            continue
+        cur, sc_cur, f_cur = scelto
+        vietati.add(cur)
+        coda.append(cur)
+        if len(coda) > TABU_DURATA:
+            vietati.discard(coda.popleft())
+        if f_cur > f_best:
+            best, best_score, f_best = cur, sc_cur, f_cur
+            if best_score >= target:
+                break
+    return best, best_score
+
+def crossover_ordine(a, b):
+    # Order crossover per multiset: il tratto a[i:j] resta al suo posto e le altre
+    # posizioni si riempiono con le carte di b nel loro ordine, saltando le copie già
+    # usate dal tratto. Le carte di b che restano sono esattamente il complemento del
+    # tratto nel multiset, quindi il figlio è sempre una permutazione valida.
+    i, j = sorted(random.sample(range(len(a) + 1), 2))
+    usate = Counter(a[i:j])
+    resto = []
+    for v in b:
+        if usate[v]:
+            usate[v] -= 1
+        else:
+            resto.append(v)
+    return tuple(resto[:i]) + a[i:j] + tuple(resto[i:])
+
+def torneo(pop, punt, k=TORNEO):
+    # Il migliore fra k individui presi a caso
+    return pop[max(random.sample(range(len(pop)), k), key=punt.__getitem__)]
+
+def valuta_popolazione(pop, batch=HC_BATCH):
+    # Una chiamata a gioca_batch per tutta la generazione se i lotti sono attivi
+    if batch > 1:
+        from gioca_batch import gioca_batch     # valutatore vettoriale (richiede numpy)
+        return [int(x) for x in gioca_batch(pop, MISS_SET, rotazione=REGOLE.rotazione)]
+    return [gioca(p) for p in pop]
+
+def valutazioni_generazione():
+    # Valutazioni di una generazione di evolvi: i figli nuovi, ciascuno con HC_FIGLI passi
+    return (POP_SIZE - N_ELITE) * max(HC_FIGLI, 1)
+
+def generazioni_per_budget(valutazioni):
+    # Generazioni di evolvi con (circa) lo stesso numero di valutazioni dei restart
+    return max(1, round(valutazioni / valutazioni_generazione()))
+
+def evolvi(generazioni, target=TARGET, stato=None, batch=HC_BATCH, tempo_max=None):
+    # Algoritmo genetico generazionale con elitismo. Con 'stato' (worker di
+    # parallel_search) pubblica i miglioramenti e si ferma sul flag di stop.
+    # Ritorna (miglior mazzo, punteggio, generazioni completate).
+    t0 = perf_counter()
+    pop = [random_perm(base) for _ in range(POP_SIZE)]
+    punt = valuta_popolazione(pop, batch)
+    i = max(range(POP_SIZE), key=punt.__getitem__)
+    best, best_sc = pop[i], punt[i]
+    if stato is not None:
+        stato.proponi(best_sc, best)
+    g = 0
+    while g < generazioni and best_sc < target:
+        if stato is not None and stato.stop.value:
+            break
+        if tempo_max is not None and perf_counter() - t0 >= tempo_max:
+            break
+        ordine = sorted(range(POP_SIZE), key=lambda i: -punt[i])
+        figli = [pop[i] for i in ordine[:N_ELITE]]
+        while len(figli) < POP_SIZE:
+            figlio = torneo(pop, punt, TORNEO)
+            if random.random() < P_CROSSOVER:
+                figlio = crossover_ordine(figlio, torneo(pop, punt, TORNEO))
+            if random.random() < P_MUTAZIONE:
+                figlio = swap_local(figlio) if random.random() < 0.7 else block_move_local(figlio)
+            figli.append(figlio)
+        # Gli elite hanno già un punteggio: si valutano solo i figli nuovi
+        punt = [punt[i] for i in ordine[:N_ELITE]]
+        if HC_FIGLI:
+            # Variante memetica: ogni figlio viene migliorato con un breve hill_climb
+            for figlio in figli[N_ELITE:]:
+                figli[len(punt)], sc = hill_climb(figlio, iters=HC_FIGLI, target=target, batch=batch)
+                punt.append(sc)
+        else:
+            punt += valuta_popolazione(figli[N_ELITE:], batch)
+        pop = figli
+        g += 1
+        i = max(range(POP_SIZE), key=punt.__getitem__)
+        if punt[i] > best_sc:
+            best, best_sc = pop[i], punt[i]
+            if stato is not None:
+                stato.proponi(best_sc, best)
+    return best, best_sc, g
+
+
 # ==========================
 # PARALLELISMO
 # ==========================
 
-def worker_search(per_proc_starts, target, seed, ret_queue, stop_event):
+class StatoCondiviso:
+    # Stato globale della ricerca in memoria condivisa (mp.RawValue / mp.RawArray):
+    # i worker lo leggono e lo scrivono direttamente, senza passare da un
+    # processo Manager. Un solo lock protegge la coppia (best_sc, best_seq).
+    def __init__(self, L, n_procs):
+        self.lock = mp.Lock()
+        self.best_sc = mp.RawValue('i', -1)     # miglior punteggio globale
+        self.best_seq = mp.RawArray('b', L)     # mazzo corrispondente
+        self.stop = mp.RawValue('b', 0)         # flag di stop cooperativo
+        self.attivi = mp.RawValue('i', n_procs) # worker non ancora terminati
+        self.evento = mp.Event()                # sveglia il master
+
+    def proponi(self, sc, seq):
+        # Pubblica 'seq' se migliora il best globale. Il primo confronto è senza
+        # lock: nel caso comune (nessun miglioramento) non c'è sincronizzazione.
+        if sc <= self.best_sc.value:
+            return False
+        with self.lock:
+            if sc <= self.best_sc.value:
+                return False
+            self.best_seq[:] = seq
+            self.best_sc.value = sc
+        self.evento.set()
+        return True
+
+    def leggi(self):
+        with self.lock:
+            return self.best_sc.value, tuple(self.best_seq)
+
+    def ferma(self):
+        self.stop.value = 1
+        self.evento.set()
+
+    def termina_worker(self):
+        with self.lock:
+            self.attivi.value -= 1
+        self.evento.set()
+
+
+class Arcipelago:
+    # Canale di migrazione del modello a isole: ogni isola pubblica i suoi
+    # MIGRANTI migliori mazzi nella propria "uscita" in memoria condivisa e,
+    # alla migrazione, l'isola r legge l'uscita della vicina r-1 (anello).
+    def __init__(self, n_isole, L, migranti=MIGRANTI):
+        self.n_isole = n_isole
+        self.L = L
+        self.migranti = migranti
+        self.locks = [mp.Lock() for _ in range(n_isole)]
+        self.scores = [mp.RawArray('i', [-1] * migranti) for _ in range(n_isole)]
+        self.decks = [mp.RawArray('b', migranti * L) for _ in range(n_isole)]
+
+    def pubblica(self, r, elite):
+        L = self.L
+        with self.locks[r]:
+            for j in range(self.migranti):
+                if j < len(elite):
+                    sc, seq = elite[j]
+                    self.decks[r][j * L:(j + 1) * L] = seq
+                    self.scores[r][j] = sc
+                else:
+                    self.scores[r][j] = -1
+
+    def ricevi(self, r):
+        L = self.L
+        v = (r - 1) % self.n_isole
+        with self.locks[v]:
+            return [(self.scores[v][j], tuple(self.decks[v][j * L:(j + 1) * L]))
+                    for j in range(self.migranti) if self.scores[v][j] >= 0]
+
+
+def worker_search(per_proc_starts, target, seed, stato, batch=HC_BATCH, isola=None, cache=None,
+                  ckpt=None, archivio=None, risultati=None, metriche=None, profilo=None,
+                  tavola_file=None):
     # Inizializza il generatore casuale del *processo*:
     # - se 'seed' è fornito, rende la run ripetibile (deterministica per quel processo)
     # - se 'seed' è None, usa entropia di sistema (run non deterministica)
@@ -159,80 +716,235 @@ def worker_search(per_proc_starts, target, seed, ret_queue, stop_event):
         random.seed(seed)
     else:
         random.seed()
+    if GENETICO:
+        # Ricerca genetica al posto dei restart, con lo stesso budget di valutazioni
+        # (per_proc_starts * HC_ITERS passi di hill_climb)
+        try:
+            _, sc, _ = evolvi(generazioni_per_budget(per_proc_starts * HC_ITERS), target, stato, batch)
+            if sc >= target:
+                stato.ferma()
+        finally:
+            stato.termina_worker()
+        return
     # Miglior risultato trovato da *questo* processo (score e sequenza corrispondente).
     # Partiamo da per indicare che non abbiamo un risultato
     local_best_sc = -1
     local_best_seq = None
+    # Modello a isole: isola = (indice r, Arcipelago); il pool elite resta locale
+    elite = []
+    # Cache dei punteggi: condivisa se passata dal master, altrimenti locale al processo
+    if cache is None and HC_CACHE:
+        cache = CacheLRU(HC_CACHE)
+    if cache is not None and (HC_MODO in ("ricottura", "tabu") or batch > 1 or HC_GUIDATO):
+        print("[cache] ATTENZIONE: la cache dei punteggi serve solo hill_climb semplice e "
+              "incrementale (HC_MODO = \"hill_climb\", HC_BATCH = 1, HC_GUIDATO = False)")
+    # Tavola di trasposizione: gioca() e gioca_finale() del processo passano dalla
+    # tavola, condivisa fra restart; a fine worker la si salva in 'tavola_file'
+    global gioca_compilato, gioca_finale
+    tavola = TavolaTrasposizioni(REGOLE, HC_TAVOLA) if HC_TAVOLA else None
+    if tavola is not None:
+        if HC_MODO not in ("ricottura", "tabu") and (batch > 1 or HC_GUIDATO or HC_INCREMENTALE):
+            print("[tavola] ATTENZIONE: HC_BATCH > 1, HC_GUIDATO e HC_INCREMENTALE non usano gioca(): "
+                  "la tavola serve solo la prima valutazione di ogni restart")
+        if TAVOLA_FILE:
+            tavola.carica(TAVOLA_FILE)
+        gioca_compilato, gioca_finale = tavola.gioca, tavola.gioca_finale
+    # Archivio elite: i restart partono (anche) dai suoi mazzi invece che solo da random_perm
+    if archivio:
+        elite = list(archivio)
+    da_elite = isola is not None or bool(archivio)
+    # Checkpoint: ckpt = (cartella, indice r, riprendi); 'locali' sono i top-K del worker
+    completati = 0
+    locali = []
+    if ckpt is not None and ckpt[2]:
+        salvato = carica_worker(ckpt[0], ckpt[1])
+        if salvato is not None:
+            random.setstate(salvato["rng"])
+            completati = salvato["restart"]
+            local_best_sc, local_best_seq = salvato["best_sc"], salvato["best_seq"]
+            locali, elite = salvato["locali"], salvato["elite"]
+            if local_best_seq is not None:
+                stato.proponi(local_best_sc, local_best_seq)
+    # Stato al confine dell'ultimo restart completato (è quello che si salva)
+    istantanea = None
+    # Risultati di ogni restart su file (una write() in append per restart)
+    scrittore = ScrittoreMazzi(risultati, len(base)) if risultati else None
+    # Strumentazione: metriche = (indice r, coda verso il master); i contatori sono
+    # globali del processo così che le varianti di hill_climb li trovino da sé
+    global METRICHE_LOCALI
+    m = METRICHE_LOCALI = Metriche(metriche[0], metriche[1], METRICHE_OGNI) if metriche else None
+    campionatore = Campionatore(profilo, PROFILO_INTERVALLO) if profilo else None
+    if campionatore is not None:
+        print(f"[profilo] worker pid {os.getpid()} campionato in {profilo}")
+        campionatore.avvia()
+
+    def salva():
+        if ckpt is not None and istantanea is not None:
+            salva_worker(ckpt[0], ckpt[1], istantanea)
 
     # La funzione worker_search rappresenta l’unità operativa eseguita in parallelo dai diversi processi.
     # Ciascun processo esegue un certo numero di restart (per_proc_starts), cercando di migliorare le sequenze
-    # e comunicando i risultati al processo principale tramite una coda condivisa (ret_queue).
-    # Se uno dei processi raggiunge il punteggio obiettivo (target), invia un segnale agli altri attraverso
-    # l’evento condiviso (stop_event), permettendo così di interrompere il lavoro rimanente ed evitare calcoli inutili.
+    # e pubblicando i risultati nello stato condiviso (stato.proponi), che sveglia il master solo
+    # quando il best globale migliora davvero.
+    # Se uno dei processi raggiunge il punteggio obiettivo (target), alza il flag stato.stop:
+    # gli altri lo leggono direttamente dalla memoria condivisa a ogni restart, senza round-trip IPC.
     # Per massimizzare l’efficacia della ricerca, ogni processo può ricevere un seme casuale differente,
     # in modo da esplorare traiettorie diverse e non ripetere le stesse sequenze.
-    # Quando un processo individua un punteggio migliore rispetto a quelli trovati finora,
-    # invia il risultato al processo principale usando ret_queue.put(("best", score, seq)),
-    # consentendo al master di monitorare i progressi della ricerca in tempo reale.
 # ---------------------------------------------------------------------------------------------------
 # ---------------------------------------------------------------------------------------------------
 
-    for _ in range(per_proc_starts):
-        # Se un altro processo ha già segnalato il successo (TARGET trovato),
-        # interrompi subito questo worker per non sprecare tempo.
-        if stop_event.is_set():
-            break
+    try:
+        for start_idx in range(completati + 1, per_proc_starts + 1):
+            # Se un altro processo ha già segnalato il successo (TARGET trovato),
+            # interrompi subito questo worker per non sprecare tempo.
+            if stato.stop.value:
+                break
 
-        # Genera una permutazione casuale del mazzo di base (restart)
-        p0 = random_perm(base)
+            # Genera il mazzo di partenza del restart: permutazione casuale oppure,
+            # nel modello a isole, eventualmente un mazzo elite perturbato
+            p0 = partenza(elite) if da_elite else random_perm(base)
 
-        # Prova a migliorare localmente la sequenza (hill climbing) e valuta il punteggio
-        cand, sc = hill_climb(p0, iters=HC_ITERS, target=target)
+            # Prova a migliorare localmente la sequenza (hill climbing) e valuta il punteggio
+            cand, sc = hill_climb(p0, iters=HC_ITERS, target=target, batch=batch, cache=cache)
 
-        # Se questo worker ha trovato un risultato migliore del suo best locale,
-        # aggiornalo e notifica il processo principale (per logging/progressi)
-        if sc > local_best_sc:
-            local_best_sc, local_best_seq = sc, cand
-            # Messaggio asíncrono: informa il master di un nuovo "best" locale
-            ret_queue.put(("best", sc, cand))
+            # Se questo worker ha trovato un risultato migliore del suo best locale,
+            # aggiornalo e proponilo come best globale (il master viene svegliato solo se migliora)
+            if sc > local_best_sc:
+                local_best_sc, local_best_seq = sc, cand
+                stato.proponi(sc, cand)
 
-        # Early-stop globale: se abbiamo raggiunto il TARGET,
-        # invia messaggio di successo, attiva lo stop-event e termina
-        if sc >= target:
-            ret_queue.put(("done", sc, cand))
-            stop_event.set()
-            break
+            if scrittore is not None:
+                scrittore.aggiungi(sc, cand)
+            if m is not None:
+                m.fine_restart()
+
+            if isola is not None:
+                r, arcipelago = isola
+                aggiorna_elite(elite, sc, cand)
+                # Migrazione periodica: invia i migliori alla vicina, accogli quelli della precedente
+                if start_idx % MIGRAZIONE_OGNI == 0:
+                    arcipelago.pubblica(r, elite)
+                    for sc_m, seq_m in arcipelago.ricevi(r):
+                        aggiorna_elite(elite, sc_m, seq_m)
+
+            if ckpt is not None:
+                aggiorna_elite(locali, sc, cand, ARCHIVIO_K)
+                istantanea = {"restart": start_idx, "rng": random.getstate(),
+                              "best_sc": local_best_sc, "best_seq": local_best_seq,
+                              "locali": list(locali), "elite": list(elite)}
+                if start_idx % CHECKPOINT_OGNI == 0:
+                    salva()
+
+            # Early-stop globale: se abbiamo raggiunto il TARGET,
+            # alza il flag di stop e termina
+            if sc >= target:
+                stato.ferma()
+                break
+    finally:
+        # Ultimo checkpoint (anche se interrotto: si salva l'ultimo confine fra restart)
+        salva()
+        if scrittore is not None:
+            scrittore.chiudi()
+        if campionatore is not None:
+            campionatore.ferma()
+        if m is not None:
+            m.invia(fine=True)
+        if cache is not None:
+            st = cache.statistiche()
+            print(f"[cache seed={seed}] hit-rate {st['hit_rate']:.1%} ({st['hit']} hit, {st['miss']} miss)")
+        if tavola is not None:
+            if tavola_file:
+                tavola.salva(tavola_file)
+            st = tavola.statistiche()
+            print(f"[tavola seed={seed}] hit-rate stati {st['hit_rate']:.1%}, "
+                  f"valutazioni fermate dalla tavola {st['risolte']:.1%}, voci {st['voci']}")
+        # Segnala al master che questo worker ha finito (anche in caso di errore)
+        stato.termina_worker()
 # Ogni iterazione esegue un restart indipendente:
 # - Se un altro processo ha già trovato il target, interrompi subito.
 # - Genera una sequenza casuale e migliorarla con hill_climb.
-# - Se ottieni un punteggio migliore del best locale, aggiorna e notifica al master ("best").
-# - Se raggiungi il target, invia messaggio "done", attiva lo stop_event e termina
-#   così tutti i processi si fermano (stop cooperativo).
+# - Se ottieni un punteggio migliore del best locale, aggiorna e proponilo allo stato condiviso.
+# - Se raggiungi il target, alza il flag di stop così tutti i processi si fermano (stop cooperativo).
 # ---------------------------------------------------------------------------------------------------
 # ---------------------------------------------------------------------------------------------------
 
-def parallel_search():
-    # Crea oggetti condivisi fra processi:
-    # - Manager: gestisce risorse condivise
-    # - ret_queue: coda per messaggi asincroni dai worker ("best", "done")
-    # - stop_event: evento per fermare cooperativamente tutti i worker
-    manager = mp.Manager()
-    ret_queue = manager.Queue()
-    stop_event = manager.Event()
-
-    # Quanti restart assegnare a ciascun processo (ripartizione quasi uniforme)
-    per_proc = ceil(MAX_STARTS / N_PROCS)
+def parallel_search(checkpoint_dir=None, resume=False, archivio=None, risultati=None,
+                    metriche=None, profila=None):
+    checkpoint_dir = checkpoint_dir or CHECKPOINT_DIR
+    archivio = archivio or ARCHIVIO
+    risultati = risultati or RISULTATI
+    metriche = metriche or METRICHE
+    profila = PROFILA_WORKER if profila is None else profila
+    if GENETICO:
+        # La ricerca genetica non ha restart: niente confini a cui salvare o da cui ripartire
+        incompatibili = [nome for nome, v in (("checkpoint/resume", checkpoint_dir or resume),
+                                              ("archivio", archivio), ("risultati", risultati),
+                                              ("metriche", metriche), ("profila", profila is not None))
+                         if v]
+        if incompatibili:
+            raise ValueError(f"GENETICO non supporta: {', '.join(incompatibili)}")
+    # L'archivio si aggiorna dai top-K salvati nei checkpoint dei worker
+    if archivio and not checkpoint_dir:
+        checkpoint_dir = archivio + ".ckpt"
 
-    # Avvio dei processi worker
-    procs = []
-    for r in range(N_PROCS):
+    if resume:
+        # Ripresa: stessa ripartizione dei restart, stessi semi, stesso target e stessa
+        # distribuzione delle partenze (isole, mazzi dell'archivio) della run salvata
+        run = carica_run(checkpoint_dir)
+        if run["L"] != len(base):
+            raise ValueError(f"il checkpoint è per mazzi di {run['L']} carte, non {len(base)}")
+        if archivio and archivio != run.get("archivio"):
+            raise ValueError(f"il checkpoint è di una run con archivio {run.get('archivio')}, non {archivio}")
+        n_procs, per_proc, semi, target = run["n_procs"], run["per_proc"], run["semi"], run["target"]
+        archivio, isole = run.get("archivio"), run.get("isole", False)
+        iniziali = [(sc, tuple(seq)) for sc, seq in run.get("iniziali", [])]
+    else:
+        n_procs = N_PROCS
+        # Quanti restart assegnare a ciascun processo (ripartizione quasi uniforme)
+        per_proc = ceil(MAX_STARTS / n_procs)
         # Seed per-processo:
         # - se SEED è fisso, sfaso i semi per avere run ripetibili ma diverse tra processi
         # - se SEED è None, ogni processo usa entropia di sistema
-        seed_r = None if SEED is None else (SEED + r + 1)
+        semi = [None if SEED is None else (SEED + r + 1) for r in range(n_procs)]
+        target = TARGET
+        isole = ISOLE
+        # Mazzi di partenza dall'archivio elite delle run precedenti
+        iniziali = carica_archivio(archivio, len(base)) if archivio else []
+        if checkpoint_dir:
+            salva_run(checkpoint_dir, {"L": len(base), "n_procs": n_procs, "per_proc": per_proc,
+                                       "semi": semi, "target": target, "isole": isole,
+                                       "archivio": archivio,
+                                       "iniziali": [[sc, list(seq)] for sc, seq in iniziali]})
+            for vecchio in glob.glob(os.path.join(checkpoint_dir, "worker_*.ckpt")):
+                os.remove(vecchio)
+
+    # Stato condiviso fra processi (memoria condivisa, nessun processo Manager):
+    # best globale + mazzo, flag di stop, contatore dei worker attivi, evento di sveglia
+    stato = StatoCondiviso(len(base), n_procs)
+    # Modello a isole: canale di migrazione ad anello fra i processi
+    arcipelago = Arcipelago(n_procs, len(base)) if isole else None
+    # Tavola di trasposizione persistente: ogni worker salva la sua in TAVOLA_FILE.r
+    tavola_file = TAVOLA_FILE if HC_TAVOLA else None
+    # Cache dei punteggi condivisa fra tutti i worker (opzionale)
+    cache = CacheCondivisa(HC_CACHE) if HC_CACHE and HC_CACHE_CONDIVISA else None
+    # Il file dei risultati (con l'intestazione) si crea prima di avviare i worker
+    if risultati:
+        ScrittoreMazzi(risultati, len(base)).chiudi()
+    # Strumentazione: i worker inviano i contatori a lotti su una coda dedicata
+    coda_metriche = mp.Queue() if metriche else None
+    flusso = FlussoMetriche(metriche, n_procs, METRICHE_OGNI) if metriche else None
+
+    # Avvio dei processi worker
+    procs = []
+    for r in range(n_procs):
         p = mp.Process(
             target=worker_search,
-            args=(per_proc, TARGET, seed_r, ret_queue, stop_event)
+            args=(per_proc, target, semi[r], stato, HC_BATCH,
+                  (r, arcipelago) if isole else None, cache,
+                  (checkpoint_dir, r, resume) if checkpoint_dir else None, iniziali, risultati,
+                  (r, coda_metriche) if metriche else None,
+                  f"profilo_worker_{r}.txt" if profila == r else None,
+                  f"{TAVOLA_FILE}.{r}" if tavola_file else None)
         )
         p.start()
         procs.append(p)
@@ -241,47 +953,91 @@ def parallel_search():
     best_sc = -1
     best_seq = None
 
-    # Loop di ascolto: finché almeno un processo è vivo, leggi aggiornamenti dalla coda
-    while any(p.is_alive() for p in procs):
-        try:
-            # Timeout breve per restare reattivi anche se non arrivano messaggi
-            msg, sc, seq = ret_queue.get(timeout=0.5)
+    # Loop di ascolto: il master dorme sull'evento finché un worker non migliora il
+    # best globale, raggiunge il target o termina. L'attesa ha comunque un limite
+    # (ATTESA_MASTER, o METRICHE_OGNI con la strumentazione): un worker ucciso
+    # (SIGKILL, OOM, crash) non arriva a termina_worker() e non sveglia nessuno
+    while True:
+        stato.evento.wait(METRICHE_OGNI if flusso else ATTESA_MASTER)
+        # Prima si azzera l'evento e poi si legge lo stato: un aggiornamento
+        # arrivato nel frattempo lo riattiva e non va perso
+        stato.evento.clear()
+        if flusso:
+            flusso.svuota(coda_metriche)
+            flusso.forse_riepilogo()
 
-            if msg == "best" and sc > best_sc:
-                # Nuovo best globale segnalato da un worker
-                best_sc, best_seq = sc, seq
-                print(f"[Aggiornamento:] nuovo best globale: {best_sc}/{TARGET}")
+        sc, seq = stato.leggi()
+        if sc > best_sc:
+            # Nuovo best globale segnalato da un worker
+            best_sc, best_seq = sc, seq
+            print(f"[Aggiornamento:] nuovo best globale: {best_sc}/{target}")
+            if flusso:
+                flusso.scrivi("best", punteggio=best_sc, mazzo=best_seq)
 
-            elif msg == "done":
-                # Un worker ha raggiunto il TARGET: registra risultato, segnala stop e esci
+        if stato.stop.value:
+            # Un worker ha raggiunto il TARGET: gli altri si fermano al prossimo restart
+            print(f"[SUCCESSO!] raggiunto target {target}")
+            break
+        if stato.attivi.value == 0 or not any(p.is_alive() for p in procs):
+            # Tutti i worker hanno esaurito i restart senza raggiungere il target
+            # (o sono morti senza segnalarlo); si rilegge il best: un worker può
+            # averlo migliorato dopo la lettura sopra
+            if stato.attivi.value:
+                print(f"[ATTENZIONE] {stato.attivi.value} worker terminati senza segnalarlo "
+                      f"(exit code {[p.exitcode for p in procs]})")
+            sc, seq = stato.leggi()
+            if sc > best_sc:
                 best_sc, best_seq = sc, seq
-                print(f"[SUCCESSO!] raggiunto target {TARGET}")
-                stop_event.set()
-                break
+                print(f"[Aggiornamento:] nuovo best globale: {best_sc}/{target}")
+                if flusso:
+                    flusso.scrivi("best", punteggio=best_sc, mazzo=best_seq)
+            break
 
-        except Exception:
-            # Timeout della queue: nessun messaggio, continua a monitorare i processi
-            pass
+    # Ultimi contatori dei worker (prima del join: un worker esce solo a coda svuotata)
+    if flusso:
+        flusso.attendi_finali(coda_metriche)
+        flusso.forse_riepilogo(forza=True)
+        flusso.chiudi()
 
-    # Assicurati che tutti i processi terminino correttamente
+    # Assicurati che tutti i processi terminino correttamente (con archivio o tavola senza
+    # timeout: ogni worker salva checkpoint e tavola uscendo, e li si vuole completi)
     for p in procs:
-        p.join(timeout=1.0)
+        p.join(None if archivio or tavola_file else 1.0)
+
+    # Tavola di trasposizione: riunisce quelle dei worker in TAVOLA_FILE
+    if tavola_file:
+        tavola = TavolaTrasposizioni(REGOLE, HC_TAVOLA)
+        tavola.carica(tavola_file)
+        for r in range(n_procs):
+            parte = f"{tavola_file}.{r}"
+            if os.path.exists(parte):
+                tavola.carica(parte)
+                os.remove(parte)
+        tavola.salva(tavola_file)
+        print(f"[tavola] {len(tavola.dati)} voci salvate in {tavola_file}")
+
+    # Archivio elite: unisce quello esistente, i top-K dei checkpoint dei worker e il best globale
+    if archivio:
+        locali = [c["locali"] for c in (carica_worker(checkpoint_dir, r) for r in range(n_procs)) if c]
+        migliore = [(best_sc, best_seq)] if best_seq is not None else []
+        salva_archivio(archivio, unisci_elite(carica_archivio(archivio, len(base)), *locali, migliore, k=ARCHIVIO_K))
 
     # Ritorna la miglior sequenza e il relativo punteggio (TARGET o best parziale)
     return best_seq, best_sc
 
 # La funzione parallel_search gestisce la ricerca in parallelo coordinando più processi indipendenti.
 # Funziona così:
-# 1. Inizializza tre primitive di sincronizzazione:
-#    - Manager: permette di creare strutture condivise tra processi.
-#    - Queue (ret_queue): coda per ricevere dai worker messaggi asincroni ("best" per progressi, "done" per successo).
-#    - Event (stop_event): flag condiviso che, quando impostato, segnala a tutti i worker di fermarsi.
+# 1. Crea lo stato condiviso (StatoCondiviso) in memoria condivisa:
+#    - best_sc / best_seq: miglior punteggio globale e relativo mazzo, protetti da un lock.
+#    - stop: flag che, quando alzato, segnala a tutti i worker di fermarsi.
+#    - attivi: numero di worker ancora in esecuzione.
+#    - evento: sveglia il master quando qualcosa cambia.
 # 2. Divide il numero totale di restart (MAX_STARTS) in blocchi quasi uguali (per_proc) per ogni processo.
 # 3. Avvia i processi worker, ciascuno con il proprio seme (seed) per esplorazioni diverse ma ripetibili.
-# 4. Il processo principale ascolta la coda:
-#    - Se riceve un messaggio "best", aggiorna il best globale e stampa i progressi.
-#    - Se riceve "done", significa che un worker ha trovato il TARGET: registra il risultato,
-#      attiva lo stop_event per fermare gli altri e interrompe il ciclo.
+# 4. Il processo principale dorme sull'evento:
+#    - Se il best globale è migliorato, lo registra e stampa i progressi.
+#    - Se il flag di stop è alzato, un worker ha trovato il TARGET: interrompe il ciclo.
+#    - Se nessun worker è più attivo, la ricerca è finita senza raggiungere il TARGET.
 # 5. Attende la terminazione di tutti i processi (join) per garantire che non restino risorse aperte.
 # 6. Infine restituisce la miglior sequenza trovata (best_seq) e il relativo punteggio (best_score).
 # ---------------------------------------------------------------------------------------------------
@@ -292,7 +1048,18 @@ def parallel_search():
 # MAIN
 # ==========================
 if __name__ == "__main__":
-    seq, sc = parallel_search()
+    ap = argparse.ArgumentParser(description="Test Combinazioni V3 - ricerca parallela")
+    ap.add_argument("--checkpoint", metavar="DIR", help="salva periodicamente lo stato dei worker in DIR")
+    ap.add_argument("--resume", metavar="DIR", help="riprende la run salvata in DIR")
+    ap.add_argument("--archivio", metavar="FILE", help="archivio elite da cui partire e da aggiornare")
+    ap.add_argument("--risultati", metavar="FILE", help="accoda i mazzi compatti di ogni restart a FILE")
+    ap.add_argument("--metriche", metavar="FILE", help="flusso JSONL delle metriche dei worker")
+    ap.add_argument("--profila", metavar="R", type=int, help="profiler a campionamento sul worker R")
+    args = ap.parse_args()
+
+    seq, sc = parallel_search(checkpoint_dir=args.resume or args.checkpoint,
+                              resume=args.resume is not None, archivio=args.archivio,
+                              risultati=args.risultati, metriche=args.metriche, profila=args.profila)
 
     print("\n== RISULTATO ==")
     print("Sequenza Vincente:", seq)
@@ -0,0 +1,114 @@
+# ================================================================
+# Checkpoint/resume e archivio elite persistente per le run di V3
+#
+# Descrizione:
+# Tutto ciò che parallel_search impara (stato dei generatori casuali,
+# restart completati, best locali) si perde all'uscita del processo.
+# Questo modulo salva su disco:
+#
+# - un checkpoint per worker (worker_<r>.ckpt, pickle): stato di 'random',
+#   numero di restart completati, best locale e top-K locali. Viene scritto
+#   al confine fra due restart, quindi ripartendo dallo stesso stato del
+#   generatore i restart successivi sono identici a quelli della run
+#   interrotta;
+# - i parametri della run (run.json), per riprenderla con la stessa
+#   ripartizione dei restart e gli stessi semi;
+# - un archivio elite dei top-K mazzi (formato binario compatto:
+#   intestazione + per ogni mazzo punteggio int16 e una carta per byte),
+#   che le run successive possono usare come punti di partenza.
+#
+# Tutte le scritture sono atomiche (file temporaneo + os.replace): un
+# kill durante il salvataggio lascia il checkpoint precedente intatto.
+# ================================================================
+
+import json
+import os
+import pickle
+import struct
+
+MAGIC = b"ELIT"
+INTESTAZIONE = struct.Struct("<4sHI")   # magic, lunghezza mazzo, numero di mazzi
+
+
+def _scrivi_atomico(path, dati):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(dati)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def unisci_elite(*liste, k):
+    # Unisce più liste di (punteggio, mazzo) tenendo i k migliori senza doppioni
+    visti = {}
+    for lista in liste:
+        for sc, seq in lista:
+            seq = tuple(seq)
+            if visti.get(seq, -1) < sc:
+                visti[seq] = sc
+    return sorted(((sc, seq) for seq, sc in visti.items()), key=lambda x: -x[0])[:k]
+
+
+# ==========================
+# ARCHIVIO ELITE
+# ==========================
+
+def salva_archivio(path, elite):
+    L = len(elite[0][1]) if elite else 0
+    parti = [INTESTAZIONE.pack(MAGIC, L, len(elite))]
+    for sc, seq in elite:
+        parti.append(struct.pack("<h", sc))
+        parti.append(bytes(seq))
+    _scrivi_atomico(path, b"".join(parti))
+
+
+def carica_archivio(path, L_atteso=None):
+    # Lista di (punteggio, mazzo); lista vuota se il file non esiste.
+    # Con L_atteso un archivio di mazzi di altra lunghezza è un errore.
+    if not os.path.exists(path):
+        return []
+    with open(path, "rb") as f:
+        dati = f.read()
+    magic, L, n = INTESTAZIONE.unpack_from(dati)
+    if magic != MAGIC:
+        raise ValueError(f"{path}: non è un archivio elite")
+    if L_atteso is not None and n and L != L_atteso:
+        raise ValueError(f"{path}: l'archivio è per mazzi di {L} carte, non {L_atteso}")
+    elite = []
+    off = INTESTAZIONE.size
+    for _ in range(n):
+        (sc,) = struct.unpack_from("<h", dati, off)
+        elite.append((sc, tuple(dati[off + 2:off + 2 + L])))
+        off += 2 + L
+    return elite
+
+
+# ==========================
+# CHECKPOINT
+# ==========================
+
+def salva_run(cartella, parametri):
+    os.makedirs(cartella, exist_ok=True)
+    _scrivi_atomico(os.path.join(cartella, "run.json"),
+                    json.dumps(parametri, indent=1).encode())
+
+
+def carica_run(cartella):
+    with open(os.path.join(cartella, "run.json")) as f:
+        return json.load(f)
+
+
+def salva_worker(cartella, r, stato):
+    # stato: {"restart", "rng", "best_sc", "best_seq", "locali", "elite"}
+    _scrivi_atomico(os.path.join(cartella, f"worker_{r}.ckpt"),
+                    pickle.dumps(stato, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def carica_worker(cartella, r):
+    # Checkpoint del worker r, oppure None se non ne ha ancora scritto uno
+    path = os.path.join(cartella, f"worker_{r}.ckpt")
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return pickle.load(f)
@@ -0,0 +1,312 @@
+# ================================================================
+# Benchmark riproducibile: valutatore, time-to-target, scalabilità
+#
+# Descrizione:
+# Tre misure, tutte salvate in JSON per confrontare le run nel tempo:
+#
+# 1. valutatore : valutazioni al secondo di gioca() (V3) su mazzi fissi per
+#                 N = 4..13 (MISS_SET = N - 1): i mazzi ottimali di
+#                 'risultati test.py', il mazzo da 40 carte di Tester.py,
+#                 i mazzi costruiti da inverse_method_sequence_builder e un
+#                 mazzo casuale a seme fisso. Se disponibili si misurano
+#                 anche gioca_circolare e gioca_batch (numpy).
+# 2. ttt        : distribuzione del time-to-target di hill_climb (restart
+#                 casuali su un solo processo) e, con --parallelo, di
+#                 parallel_search, su una lista di semi fissi; con --genetico
+#                 anche della ricerca genetica (evolvi) sugli stessi semi.
+# 3. scaling    : restart completati al secondo con 1..P processi ed
+#                 efficienza rispetto al caso a un processo.
+#
+# I parametri di ricerca (MISS_SET, HC_ITERS, quota swap/block, ...) sono
+# quelli del modulo V3 caricato, eventualmente sovrascritti da riga di
+# comando, e vengono registrati nel JSON insieme ai risultati.
+#
+# Uso:
+#   python benchmark.py --parti valutatore ttt scaling --out bench.json
+#   python benchmark.py --parti ttt --n 5 --miss 4 --target 58 --semi 0-19 --budget 120
+# ================================================================
+
+import argparse
+import importlib.util
+import json
+import multiprocessing as mp
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+from inverse_method_sequence_builder import costruisci
+from mazzo_circolare import MazzoCircolare, gioca_circolare
+from regole import Regole
+
+CARTELLA = os.path.dirname(os.path.abspath(__file__))
+
+# Mazzi ottimali registrati in 'risultati test.py' e mazzo di Tester.py (MISS_SET = N - 1)
+MAZZI_NOTI = {
+    4: (2, 2, 4, 3, 1, 4, 2, 1, 3, 3, 1, 1, 4, 2, 4, 3),
+    5: (3, 2, 1, 2, 1, 5, 3, 5, 1, 5, 3, 1, 4, 4, 4, 2, 2, 5, 4, 3),
+    6: (4, 4, 6, 4, 2, 1, 6, 4, 6, 5, 1, 3, 3, 6, 2, 2, 3, 3, 1, 2, 5, 5, 1, 5),
+    7: (6, 5, 3, 5, 5, 4, 4, 2, 1, 6, 3, 5, 3, 7, 1, 2, 7, 7, 7, 6, 2, 1, 4, 1, 3, 2, 4, 6),
+    8: (5, 8, 1, 5, 8, 8, 7, 2, 4, 7, 4, 4, 4, 1, 5, 5, 2, 1, 3, 2, 7, 1, 6, 6, 6, 3,
+        8, 2, 3, 3, 6, 7),
+    10: (8, 6, 4, 10, 5, 9, 4, 6, 10, 4, 3, 7, 3, 8, 3, 4, 1, 1, 1, 2, 7, 10, 7, 9, 9, 7,
+         10, 6, 5, 3, 5, 6, 8, 5, 2, 9, 2, 1, 2, 8),
+}
+
+
+def carica_v3():
+    # Il file di V3 ha spazi nel nome: lo si carica dal percorso
+    nome = "test_combinazioni_v3"
+    if nome in sys.modules:
+        return sys.modules[nome]
+    spec = importlib.util.spec_from_file_location(
+        nome, os.path.join(CARTELLA, "Test combinazioni V3.py"))
+    modulo = importlib.util.module_from_spec(spec)
+    sys.modules[nome] = modulo
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def configura_v3(v3, N, miss_set, target=None, hc_iters=None):
+    # Adatta le regole e i parametri globali di V3 al caso N
+    v3.imposta_regole(Regole(N, 4, miss_set))
+    v3.TARGET = target if target is not None else 2 * N * (N + 1) - 2
+    if hc_iters is not None:
+        v3.HC_ITERS = hc_iters
+    return v3
+
+
+def parametri_v3(v3):
+    return {k: getattr(v3, k) for k in ("MISS_SET", "TARGET", "HC_ITERS", "HC_BATCH",
+                                        "HC_INCREMENTALE", "HC_GUIDATO", "HC_CACHE", "ISOLE",
+                                        "HC_MODO", "SECONDARIO", "SCHEDULA", "TEMP_INIZIALE",
+                                        "TEMP_FINALE", "TABU_VICINI", "TABU_DURATA")
+            if hasattr(v3, k)}
+
+
+def _per_secondo(f, durata):
+    # Chiamate di f() al secondo, ripetendo finché non passa 'durata'
+    n = 0
+    t0 = time.perf_counter()
+    while True:
+        for _ in range(50):
+            f()
+        n += 50
+        dt = time.perf_counter() - t0
+        if dt >= durata:
+            return n / dt
+
+
+# ==========================
+# 1. VALUTATORE
+# ==========================
+
+def bench_valutatore(durata=0.3, valori_N=range(4, 14)):
+    v3 = carica_v3()
+    try:
+        from gioca_batch import gioca_batch
+    except ImportError:
+        gioca_batch = None
+
+    righe = []
+    for N in valori_N:
+        miss_set = N - 1
+        # gioca() di V3 legge MISS_SET e base dal modulo
+        configura_v3(v3, N, miss_set)
+        rng = random.Random(N)
+        mazzi = {}
+        if N in MAZZI_NOTI:
+            mazzi["noto"] = MAZZI_NOTI[N]
+        mazzi["sintesi"] = costruisci(N, miss_set)[0]
+        casuale = list(v3.base)
+        rng.shuffle(casuale)
+        mazzi["casuale"] = tuple(casuale)
+
+        mazzo_c = MazzoCircolare(4 * N)
+        for tipo, p in mazzi.items():
+            riga = {"N": N, "mazzo": tipo, "punteggio": v3.gioca(p),
+                    "gioca": _per_secondo(lambda: v3.gioca(p), durata),
+                    "gioca_circolare": _per_secondo(lambda: gioca_circolare(p, miss_set, mazzo_c), durata)}
+            if gioca_batch is not None:
+                lotto = [p] * 1024
+                riga["gioca_batch"] = 1024 * _per_secondo(lambda: gioca_batch(lotto, miss_set), durata)
+            righe.append(riga)
+            print(f"[valutatore] N={N:>2} {tipo:>8} punt={riga['punteggio']:>3} "
+                  f"gioca={riga['gioca']:,.0f}/s")
+    return righe
+
+
+# ==========================
+# 2. TIME-TO-TARGET
+# ==========================
+
+def ttt_hill_climb(N, miss_set, target, semi, budget, hc_iters=None):
+    # Per ogni seme: restart casuali + hill_climb fino al target o al budget (secondi)
+    v3 = configura_v3(carica_v3(), N, miss_set, target, hc_iters)
+    esiti = []
+    for seme in semi:
+        random.seed(seme)
+        t0 = time.perf_counter()
+        restart = 0
+        best = -1
+        while time.perf_counter() - t0 < budget:
+            restart += 1
+            _, sc = v3.hill_climb(v3.random_perm(v3.base), iters=v3.HC_ITERS, target=target)
+            best = max(best, sc)
+            if sc >= target:
+                break
+        dt = time.perf_counter() - t0
+        # Valutazioni: HC_ITERS per restart (per eccesso sull'ultimo, interrotto al target)
+        esiti.append({"seme": seme, "secondi": dt, "restart": restart, "best": best,
+                      "valutazioni": restart * v3.HC_ITERS, "raggiunto": best >= target})
+        print(f"[ttt] seme={seme} best={best}/{target} restart={restart} t={dt:.2f}s")
+    return {"modo": "hill_climb", "parametri": parametri_v3(v3), "esiti": esiti,
+            "riassunto": riassunto_ttt(esiti)}
+
+
+def ttt_genetico(N, miss_set, target, semi, budget):
+    # Per ogni seme: una popolazione che evolve fino al target o al budget (secondi)
+    v3 = configura_v3(carica_v3(), N, miss_set, target)
+    esiti = []
+    for seme in semi:
+        random.seed(seme)
+        t0 = time.perf_counter()
+        _, best, gen = v3.evolvi(10 ** 9, target=target, tempo_max=budget)
+        dt = time.perf_counter() - t0
+        esiti.append({"seme": seme, "secondi": dt, "generazioni": gen, "best": best,
+                      "raggiunto": best >= target})
+        print(f"[ttt genetico] seme={seme} best={best}/{target} generazioni={gen} t={dt:.2f}s")
+    parametri = parametri_v3(v3)
+    parametri.update({k: getattr(v3, k) for k in ("POP_SIZE", "TORNEO", "P_CROSSOVER",
+                                                  "P_MUTAZIONE", "N_ELITE")})
+    return {"modo": "genetico", "parametri": parametri, "esiti": esiti,
+            "riassunto": riassunto_ttt(esiti)}
+
+
+def ttt_parallel(N, miss_set, target, semi, n_procs, hc_iters=None):
+    # parallel_search di V3 con SEED fisso (i semi dei worker ne derivano).
+    # I worker ereditano i parametri modificati solo con start method "fork".
+    v3 = configura_v3(carica_v3(), N, miss_set, target, hc_iters)
+    v3.N_PROCS = n_procs
+    esiti = []
+    for seme in semi:
+        v3.SEED = seme
+        t0 = time.perf_counter()
+        _, best = v3.parallel_search()
+        dt = time.perf_counter() - t0
+        esiti.append({"seme": seme, "secondi": dt, "best": best, "raggiunto": best >= target})
+    return {"modo": "parallel_search", "processi": n_procs, "parametri": parametri_v3(v3),
+            "esiti": esiti, "riassunto": riassunto_ttt(esiti)}
+
+
+def riassunto_ttt(esiti):
+    tempi = sorted(e["secondi"] for e in esiti if e["raggiunto"])
+    out = {"run": len(esiti), "successi": len(tempi)}
+    if tempi:
+        out.update({"mediana": statistics.median(tempi), "media": statistics.fmean(tempi),
+                    "min": tempi[0], "max": tempi[-1]})
+    valutazioni = [e["valutazioni"] for e in esiti if e["raggiunto"] and "valutazioni" in e]
+    if valutazioni:
+        out["valutazioni_mediana"] = statistics.median(valutazioni)
+    return out
+
+
+# ==========================
+# 3. SCALABILITÀ
+# ==========================
+
+def _worker_scaling(N, miss_set, hc_iters, seme, durata, coda):
+    # Processo figlio: restart + hill_climb per 'durata' secondi, conta i restart
+    v3 = configura_v3(carica_v3(), N, miss_set, target=10 ** 9, hc_iters=hc_iters)
+    random.seed(seme)
+    t0 = time.perf_counter()
+    restart = 0
+    while time.perf_counter() - t0 < durata:
+        v3.hill_climb(v3.random_perm(v3.base), iters=v3.HC_ITERS, target=10 ** 9)
+        restart += 1
+    coda.put((restart, time.perf_counter() - t0))
+
+
+def bench_scaling(N, miss_set, processi, durata, hc_iters=1000):
+    righe = []
+    base_rate = None
+    for P in processi:
+        coda = mp.Queue()
+        procs = [mp.Process(target=_worker_scaling, args=(N, miss_set, hc_iters, 1000 + r, durata, coda))
+                 for r in range(P)]
+        for p in procs:
+            p.start()
+        risultati = [coda.get() for _ in procs]
+        for p in procs:
+            p.join()
+        rate = sum(r / dt for r, dt in risultati)
+        if base_rate is None:
+            base_rate = rate / P
+        righe.append({"processi": P, "restart_al_secondo": rate,
+                      "efficienza": rate / (P * base_rate) if base_rate else 0.0})
+        print(f"[scaling] P={P} restart/s={rate:.2f} efficienza={righe[-1]['efficienza']:.2f}")
+    return righe
+
+
+# ==========================
+# MAIN
+# ==========================
+
+def intervallo(testo):
+    # "0-19" -> [0..19]; "1,5,9" -> [1, 5, 9]
+    if "-" in testo:
+        a, b = testo.split("-")
+        return list(range(int(a), int(b) + 1))
+    return [int(x) for x in testo.split(",")]
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark del gioco delle combinazioni")
+    ap.add_argument("--parti", nargs="+", default=["valutatore", "ttt", "scaling"],
+                    choices=["valutatore", "ttt", "scaling"])
+    ap.add_argument("--out", default="benchmark.json")
+    ap.add_argument("--n", type=int, default=5, help="N per time-to-target e scaling")
+    ap.add_argument("--miss", type=int, default=None, help="MISS_SET (default N - 1)")
+    ap.add_argument("--target", type=int, default=None, help="default 2N(N+1) - 2")
+    ap.add_argument("--hc-iters", type=int, default=None)
+    ap.add_argument("--semi", type=intervallo, default=intervallo("0-9"))
+    ap.add_argument("--budget", type=float, default=60.0, help="secondi per seme (ttt)")
+    ap.add_argument("--parallelo", type=int, default=0, help="processi per ttt di parallel_search")
+    ap.add_argument("--genetico", action="store_true", help="ttt anche della ricerca genetica")
+    ap.add_argument("--hc-modo", choices=["hill_climb", "ricottura", "tabu"], help="HC_MODO di V3")
+    ap.add_argument("--secondario", choices=["rimaste", "blocco"], help="SECONDARIO di V3")
+    ap.add_argument("--schedula", help="SCHEDULA di V3 (geometrica, lineare, iperbolica, nulla)")
+    ap.add_argument("--processi", type=intervallo, default=None, help="es. 1-8 (default 1..cpu)")
+    ap.add_argument("--durata", type=float, default=10.0, help="secondi per punto di scaling")
+    args = ap.parse_args()
+
+    miss = args.miss if args.miss is not None else args.n - 1
+    # Modalità di ricerca locale di V3 (i processi figli le ereditano con "fork")
+    v3 = carica_v3()
+    for nome, valore in (("HC_MODO", args.hc_modo), ("SECONDARIO", args.secondario),
+                         ("SCHEDULA", args.schedula)):
+        if valore is not None:
+            setattr(v3, nome, valore)
+    target = args.target if args.target is not None else 2 * args.n * (args.n + 1) - 2
+
+    out = {"meta": {"data": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                    "piattaforma": platform.platform(), "cpu": mp.cpu_count(),
+                    "argomenti": {k: v for k, v in vars(args).items()}}}
+    if "valutatore" in args.parti:
+        out["valutatore"] = bench_valutatore()
+    if "ttt" in args.parti:
+        out["ttt"] = [ttt_hill_climb(args.n, miss, target, args.semi, args.budget, args.hc_iters)]
+        if args.genetico:
+            out["ttt"].append(ttt_genetico(args.n, miss, target, args.semi, args.budget))
+        if args.parallelo:
+            out["ttt"].append(ttt_parallel(args.n, miss, target, args.semi, args.parallelo, args.hc_iters))
+    if "scaling" in args.parti:
+        processi = args.processi or list(range(1, mp.cpu_count() + 1))
+        out["scaling"] = bench_scaling(args.n, miss, processi, args.durata,
+                                       args.hc_iters or 1000)
+
+    with open(args.out, "w") as f:
+        json.dump(out, f, indent=1)
+    print(f"Risultati scritti in {args.out}")
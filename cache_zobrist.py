@@ -0,0 +1,112 @@
+# ================================================================
+# Cache dei punteggi con hash di Zobrist
+#
+# Descrizione:
+# Fra restart e passi di hill climbing lo stesso mazzo viene rivalutato
+# molte volte (mosse laterali accettate con sc >= best_score che ciclano
+# sui plateau, swap di valori uguali, ...). Qui si tiene una cache
+# limitata mazzo -> punteggio.
+#
+# Chiave:
+# Hash di Zobrist: a ogni coppia (posizione, valore) è associato un
+# numero casuale a 64 bit e l'hash del mazzo è lo XOR di quelli delle sue
+# carte. Una mossa che cambia le posizioni lo..hi aggiorna l'hash in
+# O(hi - lo) (swap: O(1)) invece di riscandire tutta la tupla. Le chiavi
+# non vengono verificate sul mazzo: una collisione a 64 bit è trascurabile
+# rispetto al numero di valutazioni di una run.
+#
+# Cache:
+# - CacheLRU: dizionario ordinato locale al processo, espulsione LRU.
+# - CacheCondivisa: tabella a indirizzamento diretto in memoria condivisa
+#   (mp.RawArray) usabile da tutti i worker, senza lock: ogni slot è una
+#   sola parola a 64 bit (48 bit di chiave + 16 bit di punteggio) scritta
+#   in un colpo, quindi una lettura non vede mai metà di un'altra scrittura;
+#   in caso di conflitto lo slot viene semplicemente sovrascritto.
+# Entrambe contano hit e miss (statistiche()).
+# ================================================================
+
+import multiprocessing as mp
+import random
+from collections import OrderedDict
+
+ZOBRIST_SEED = 20251018   # fisso: tutti i processi devono usare le stesse chiavi
+
+
+class Zobrist:
+
+    def __init__(self, L, max_valore, seed=ZOBRIST_SEED):
+        rng = random.Random(seed)
+        self.z = [[rng.getrandbits(64) for _ in range(max_valore + 1)] for _ in range(L)]
+
+    def hash(self, t):
+        h = 0
+        z = self.z
+        for p, v in enumerate(t):
+            h ^= z[p][v]
+        return h
+
+    def aggiorna(self, h, vecchio, nuovo, lo, hi):
+        # Hash di 'nuovo' a partire da quello di 'vecchio', sapendo che le due
+        # sequenze differiscono solo nelle posizioni lo..hi (estremi inclusi)
+        z = self.z
+        for p in range(lo, hi + 1):
+            a, b = vecchio[p], nuovo[p]
+            if a != b:
+                h ^= z[p][a] ^ z[p][b]
+        return h
+
+
+class CacheLRU:
+
+    def __init__(self, capacita):
+        self.capacita = capacita
+        self.dati = OrderedDict()
+        self.hit = 0
+        self.miss = 0
+
+    def get(self, h):
+        sc = self.dati.get(h)
+        if sc is None:
+            self.miss += 1
+            return None
+        self.dati.move_to_end(h)
+        self.hit += 1
+        return sc
+
+    def put(self, h, sc):
+        self.dati[h] = sc
+        self.dati.move_to_end(h)
+        if len(self.dati) > self.capacita:
+            self.dati.popitem(last=False)
+
+    def statistiche(self):
+        tot = self.hit + self.miss
+        return {"hit": self.hit, "miss": self.miss, "hit_rate": self.hit / tot if tot else 0.0,
+                "voci": len(self.dati)}
+
+
+class CacheCondivisa:
+
+    MASCHERA = (1 << 64) - (1 << 16)   # 48 bit alti: chiave; 16 bit bassi: punteggio
+
+    def __init__(self, capacita):
+        self.capacita = capacita
+        self.slot = mp.RawArray('Q', capacita)
+        self.hit = 0                    # contatori locali al processo che li usa
+        self.miss = 0
+
+    def get(self, h):
+        v = self.slot[h % self.capacita]
+        if v and (v & self.MASCHERA) == (h & self.MASCHERA):
+            self.hit += 1
+            return v & 0xFFFF
+        self.miss += 1
+        return None
+
+    def put(self, h, sc):
+        self.slot[h % self.capacita] = (h & self.MASCHERA) | (sc & 0xFFFF)
+
+    def statistiche(self):
+        tot = self.hit + self.miss
+        return {"hit": self.hit, "miss": self.miss, "hit_rate": self.hit / tot if tot else 0.0,
+                "voci": self.capacita}
@@ -0,0 +1,188 @@
+# ================================================================
+# Distribuzione dei punteggi su mazzi casuali (Monte Carlo in streaming)
+#
+# Descrizione:
+# Stima la distribuzione di gioca() su mazzi uniformemente casuali del
+# multiset {1^4, ..., N^4} (es. N = 10: il mazzo da 40 carte di Tester.py,
+# N = 13), insieme a quella della lunghezza della partita e delle carte
+# rimaste a fine partita.
+#
+# Streaming:
+# Ogni processo genera lotti di mazzi con NumPy (una permutazione
+# indipendente per riga), li valuta con gioca_batch e aggiorna due
+# istogrammi a dimensione fissa (punteggio 0..B(N), carte rimaste 0..L).
+# Nessun campione viene conservato: la memoria è costante qualunque sia
+# il numero di campioni. I processi inviano al master solo gli istogrammi
+# parziali (ogni 'ogni' secondi), che il master somma.
+#
+# Momenti e arresto:
+# Punteggi e carte rimaste sono interi limitati, quindi media e varianza
+# calcolate dagli istogrammi sono esatte. Con --precisione E il master si
+# ferma appena la semiampiezza dell'intervallo di confidenza al 95% della
+# media del punteggio scende sotto E.
+#
+# Lunghezza della partita:
+# - prese = L - carte rimaste;
+# - letture (passi di gioca) = punteggio + (MISS_SET + 1) se il mazzo non
+#   si svuota: ogni presa in posizione k costa k + 1 letture e vale k + 1
+#   punti, e la partita finisce dopo MISS_SET + 1 letture a vuoto.
+# Entrambe si ricavano quindi dagli istogrammi senza contarle a parte.
+#
+# Uso:
+#   python distribuzione_mc.py 10 --campioni 100000000 --precisione 0.005
+#   python distribuzione_mc.py 13 --procs 8 --json n13.json
+# ================================================================
+
+import argparse
+import json
+import math
+import multiprocessing as mp
+import queue
+import time
+
+import numpy as np
+
+from gioca_batch import gioca_batch
+
+Z_95 = 1.959963984540054
+
+
+def campiona(seme, N, miss_set, quota, lotto, ogni, coda, stop):
+    # Processo campionatore: invia (h_punteggio, h_rimaste) parziali e infine None
+    rng = np.random.default_rng(seme)
+    base = np.repeat(np.arange(1, N + 1, dtype=np.int16), 4)
+    L = len(base)
+    B = 2 * N * (N + 1)
+    h_punt = np.zeros(B + 1, dtype=np.int64)
+    h_rim = np.zeros(L + 1, dtype=np.int64)
+    fatti = 0
+    t_invio = time.time()
+    while fatti < quota and not stop.is_set():
+        k = min(lotto, quota - fatti)
+        mazzi = rng.permuted(np.tile(base, (k, 1)), axis=1)
+        punt, rim = gioca_batch(mazzi, miss_set, rimaste=True)
+        h_punt += np.bincount(punt, minlength=B + 1)
+        h_rim += np.bincount(rim, minlength=L + 1)
+        fatti += k
+        if time.time() - t_invio >= ogni:
+            coda.put((h_punt, h_rim))
+            h_punt = np.zeros_like(h_punt)
+            h_rim = np.zeros_like(h_rim)
+            t_invio = time.time()
+    coda.put((h_punt, h_rim))
+    coda.put(None)
+
+
+def momenti(h):
+    # (n, media, deviazione standard) da un istogramma di interi 0..len(h)-1
+    n = int(h.sum())
+    if not n:
+        return 0, 0.0, 0.0
+    x = np.arange(len(h))
+    media = float((h * x).sum()) / n
+    var = float((h * (x - media) ** 2).sum()) / (n - 1) if n > 1 else 0.0
+    return n, media, math.sqrt(var)
+
+
+def quantile(h, q):
+    cum = np.cumsum(h)
+    return int(np.searchsorted(cum, q * cum[-1]))
+
+
+def semiampiezza(h):
+    n, _, sd = momenti(h)
+    return Z_95 * sd / math.sqrt(n) if n > 1 else math.inf
+
+
+def distribuzione(N, campioni, miss_set=4, n_procs=None, lotto=4096, precisione=None,
+                  seme=None, ogni=2.0, stampa_ogni=10.0):
+    # Ritorna (h_punteggio, h_rimaste) sommati su tutti i processi
+    n_procs = n_procs or mp.cpu_count()
+    L = 4 * N
+    B = 2 * N * (N + 1)
+    semi = np.random.SeedSequence(seme).spawn(n_procs)
+    quote = [campioni // n_procs + (r < campioni % n_procs) for r in range(n_procs)]
+    coda = mp.Queue()
+    stop = mp.Event()
+    procs = [mp.Process(target=campiona, args=(semi[r], N, miss_set, quote[r], lotto, ogni, coda, stop))
+             for r in range(n_procs)]
+    for p in procs:
+        p.start()
+
+    h_punt = np.zeros(B + 1, dtype=np.int64)
+    h_rim = np.zeros(L + 1, dtype=np.int64)
+    finiti = 0
+    t0 = t_stampa = time.time()
+    while finiti < n_procs:
+        try:
+            msg = coda.get(timeout=1.0)
+        except queue.Empty:
+            continue
+        if msg is None:
+            finiti += 1
+            continue
+        h_punt += msg[0]
+        h_rim += msg[1]
+        e = semiampiezza(h_punt)
+        if precisione is not None and e <= precisione and not stop.is_set():
+            stop.set()
+        if time.time() - t_stampa >= stampa_ogni:
+            n = int(h_punt.sum())
+            print(f"[{time.time() - t0:7.1f}s] {n:,} campioni ({n / (time.time() - t0):,.0f}/s)  "
+                  f"media {momenti(h_punt)[1]:.4f} ± {e:.4f}")
+            t_stampa = time.time()
+    for p in procs:
+        p.join()
+    return h_punt, h_rim
+
+
+def riepilogo(N, h_punt, h_rim, miss_set=4):
+    L = 4 * N
+    n, media, sd = momenti(h_punt)
+    h_prese = h_rim[::-1]                       # prese = L - rimaste
+    _, media_prese, sd_prese = momenti(h_prese)
+    _, media_rim, sd_rim = momenti(h_rim)
+    return {
+        "N": N, "miss_set": miss_set, "campioni": n,
+        "punteggio": {"media": media, "sd": sd, "ic95": semiampiezza(h_punt),
+                      "quantili": {q: quantile(h_punt, q) for q in (0.01, 0.25, 0.5, 0.75, 0.99)},
+                      "max_visto": int(np.flatnonzero(h_punt)[-1]), "istogramma": h_punt.tolist()},
+        "prese": {"media": media_prese, "sd": sd_prese, "istogramma": h_prese.tolist()},
+        "rimaste": {"media": media_rim, "sd": sd_rim, "svuotati": int(h_rim[0]),
+                    "istogramma": h_rim.tolist()},
+        "letture_medie": media + (miss_set + 1) * (1 - h_rim[0] / n),
+        "L": L, "B": 2 * N * (N + 1),
+    }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Distribuzione Monte Carlo dei punteggi di gioca()")
+    ap.add_argument("N", type=int)
+    ap.add_argument("--campioni", type=float, default=1e7, help="numero massimo di mazzi (default 1e7)")
+    ap.add_argument("--miss", type=int, default=4, help="MISS_SET (default 4)")
+    ap.add_argument("--procs", type=int, help="processi (default: tutti i core)")
+    ap.add_argument("--lotto", type=int, default=4096, help="mazzi per chiamata di gioca_batch")
+    ap.add_argument("--precisione", type=float, help="ferma quando l'IC 95%% della media è ± questo valore")
+    ap.add_argument("--seme", type=int)
+    ap.add_argument("--json", help="salva il riepilogo (con gli istogrammi) in questo file")
+    args = ap.parse_args()
+
+    t0 = time.time()
+    h_punt, h_rim = distribuzione(args.N, int(args.campioni), args.miss, args.procs, args.lotto,
+                                  args.precisione, args.seme)
+    dt = time.time() - t0
+    r = riepilogo(args.N, h_punt, h_rim, args.miss)
+    p = r["punteggio"]
+    print(f"N = {args.N} (L = {r['L']}, B(N) = {r['B']}), MISS_SET = {args.miss}: "
+          f"{r['campioni']:,} mazzi in {dt:.1f}s ({r['campioni'] / dt:,.0f}/s)")
+    print(f"Punteggio: media {p['media']:.4f} ± {p['ic95']:.4f} (IC 95%), sd {p['sd']:.3f}, "
+          f"max visto {p['max_visto']}, quantili {p['quantili']}")
+    print(f"Prese: media {r['prese']['media']:.3f}, sd {r['prese']['sd']:.3f}   "
+          f"Rimaste: media {r['rimaste']['media']:.3f}, mazzi svuotati {r['rimaste']['svuotati']}   "
+          f"Letture medie: {r['letture_medie']:.3f}")
+    print("Istogramma del punteggio (valore: frequenza):")
+    for v in np.flatnonzero(h_punt):
+        print(f"  {v:4d}: {h_punt[v] / r['campioni']:.6f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(r, f, indent=1)
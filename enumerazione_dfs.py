@@ -0,0 +1,185 @@
+# ================================================================
+# Enumerazione esaustiva "pigra" (DFS sul mazzo parzialmente assegnato)
+#
+# Descrizione:
+# V1 scorre distinct_permutations(base) e simula ogni permutazione per
+# intero: già per N = 5 le permutazioni sono circa 3*10^11, ma quasi tutte
+# condividono la stessa traiettoria di gioco, perché la partita legge solo
+# una parte delle carte.
+#
+# Qui la partita viene simulata su un mazzo con posizioni ancora "vuote":
+# il valore di una posizione viene scelto (fra quelli ancora disponibili
+# nel multiset) solo quando la scansione di gioca() la legge per la prima
+# volta. Tutti i mazzi che differiscono solo in posizioni mai lette
+# vengono quindi esplorati una volta sola.
+#
+# Potatura:
+# - Limite superiore: ogni carta presa vale quanto la sua posizione, e
+#   quando restano n carte le posizioni lette sono al più min(n, W) con
+#   W = MISS_SET + 1. Assegnando in modo goloso le carte ancora nel mazzo
+#   (anche quelle non lette, note dai conteggi rimasti) alle prese future
+#   di capienza min(n, W), min(n-1, W), ..., 1 si ottiene il miglior caso
+#   per il punteggio che manca: se punt + miglior caso <= best si pota.
+# - Barriera: per le regole date si verifica per forza bruta il più piccolo
+#   n tale che nessun mazzo di n carte (al più 'molteplicita' copie per
+#   valore) si svuota completamente (n = 5 per 4 copie: la "Five-Card
+#   Barrier" del README). Per svuotare un mazzo bisogna passare da uno
+#   stato con esattamente n carte, quindi da ogni stato con almeno n carte
+#   resta almeno una carta bloccata. Un residuo bloccato vale almeno 2 (una
+#   sola carta 1 verrebbe presa), perciò il punteggio è al più B(N) - 2:
+#   una volta trovato un mazzo da B(N) - 2 la ricerca si chiude e il
+#   massimo è dimostrato.
+# - Trasposizioni: lo stato futuro dipende solo dalla sequenza delle carte
+#   rimaste (0 = non ancora letta) e dai conteggi ancora liberi; gli stati
+#   già esplorati senza migliorare 'best' non vengono riesplorati.
+#
+# Testimone:
+# Se si conosce già un mazzo da B(N) - 2 (es. da 'risultati test.py') lo si
+# può passare come punto di partenza: viene rigiocato per verificarlo e la
+# barriera chiude la ricerca subito. Senza testimone la DFS lo cerca da sé
+# (N = 4 in ~1 s, N = 5 in ~12 min su un core).
+#
+# Uso:
+#   python enumerazione_dfs.py 5        (N = 5, MISS_SET = N - 1)
+#   python enumerazione_dfs.py 6 5 4,4,6,4,2,1,6,4,6,5,1,3,3,6,2,2,3,3,1,2,5,5,1,5
+# ================================================================
+
+import sys
+import time
+from collections import Counter
+from itertools import product
+
+from regole import Regole, valutatore
+
+
+def barriera(miss_set, molteplicita=4):
+    # Più piccolo n per cui nessun mazzo di n carte si svuota (None se non trovato).
+    # Un mazzo svuotabile contiene solo valori <= n: basta provare quelli.
+    for n in range(1, molteplicita + 2):
+        gioca = valutatore(Regole(n, molteplicita, miss_set))   # compilato una volta per n
+        svuotabili = [
+            d for d in product(range(1, min(n, miss_set + 1) + 1), repeat=n)
+            if max(Counter(d).values()) <= molteplicita and gioca(d) == sum(d)
+        ]
+        if not svuotabili:
+            return n
+    return None
+
+
+def massimo_esatto(N, miss_set=None, molteplicita=4, best=-1, testimone=None,
+                   max_tabella=1_000_000):
+    # Restituisce (F_max, mazzo testimone, nodi) per il multiset {1^m, ..., N^m}.
+    # 'best' è un punteggio già noto (il testimone si trova solo se lo si supera):
+    # partendo da B(N) - 3 la ricerca trova un mazzo da B(N) - 2 (se esiste) e
+    # dimostra che nessun mazzo fa di più. 'testimone' è un mazzo di partenza
+    # già noto, rigiocato qui per ricavarne il punteggio.
+    if miss_set is None:
+        miss_set = N - 1
+    L = N * molteplicita
+    W = miss_set + 1
+    val = [0] * L                       # valore assegnato ad ogni posizione (0 = non letta)
+    cnt = [0] + [molteplicita] * N      # copie ancora libere di ogni valore
+    falliti = set()                     # stati da cui non si supera 'best'
+    B = molteplicita * N * (N + 1) // 2
+    n_barriera = barriera(miss_set, molteplicita)
+    stato = {"best": best, "mazzo": None, "nodi": 0}
+    if testimone is not None:
+        if sorted(testimone) != [v for v in range(1, N + 1) for _ in range(molteplicita)]:
+            raise ValueError("il testimone non è una permutazione del multiset")
+        sc = valutatore(Regole(N, molteplicita, miss_set))(testimone)
+        if sc > best:
+            stato["best"], stato["mazzo"] = sc, tuple(testimone)
+
+    def registra(punt):
+        # Nuovo best: le posizioni mai lette si riempiono con le carte rimaste
+        libere = [v for v in range(1, N + 1) for _ in range(cnt[v])]
+        stato["best"] = punt
+        stato["mazzo"] = tuple(val[p] if val[p] else libere.pop() for p in range(L))
+
+    def limite(order, punt):
+        # Oltre la barriera resta sempre un residuo bloccato di valore >= 2
+        if n_barriera is not None and len(order) >= n_barriera and B - 2 <= stato["best"]:
+            return B - 2
+        # Miglior caso: prese future di capienza min(n - j, W), valori più alti prima
+        disp = cnt[:]
+        for p in order:
+            if val[p]:
+                disp[val[p]] += 1
+        tot = punt
+        v = N
+        for n in range(len(order), 0, -1):
+            c = min(n, W, N)
+            if v > c:
+                v = c
+            while v and not disp[v]:
+                v -= 1
+            if not v:
+                break
+            disp[v] -= 1
+            tot += v
+        return tot
+
+    def esplora(order, punt):
+        stato["nodi"] += 1
+        if punt > stato["best"]:
+            registra(punt)
+        if not order or limite(order, punt) <= stato["best"]:
+            return
+        chiave = (tuple(val[p] for p in order), tuple(cnt))
+        if chiave in falliti:
+            return
+        prima = stato["best"]
+        scansiona(order, 0, punt)
+        if stato["best"] == prima and len(falliti) < max_tabella:
+            falliti.add(chiave)
+
+    def scansiona(order, k, punt):
+        # Stessa scansione di gioca() fra due prese: posizioni 0..min(n, W)-1
+        lim = min(len(order), W)
+        while k < lim:
+            p = order[k]
+            v = val[p]
+            if not v:
+                # Prima lettura della posizione p: si ramifica sui valori liberi,
+                # provando per primo quello che fa presa (k + 1)
+                scelte = [k + 1] if k + 1 <= N and cnt[k + 1] else []
+                scelte += [u for u in range(N, 0, -1) if cnt[u] and u != k + 1]
+                for u in scelte:
+                    val[p] = u
+                    cnt[u] -= 1
+                    scansiona(order, k, punt)
+                    cnt[u] += 1
+                val[p] = 0
+                return
+            if v == k + 1:
+                # Presa: cancellazione + riordina in un'unica operazione
+                esplora(order[k + 1:] + order[:k], punt + k + 1)
+                return
+            k += 1
+        # Nessuna presa nella finestra: la partita finisce con punteggio 'punt'
+        if punt > stato["best"]:
+            registra(punt)
+
+    esplora(tuple(range(L)), 0)
+    return stato["best"], stato["mazzo"], stato["nodi"]
+
+
+if __name__ == "__main__":
+    N = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    miss_set = int(sys.argv[2]) if len(sys.argv) > 2 else N - 1
+    testimone = tuple(int(x) for x in sys.argv[3].split(",")) if len(sys.argv) > 3 else None
+    B = 2 * N * (N + 1)
+
+    t0 = time.time()
+    # Si parte da B(N) - 3: se esiste un mazzo da B(N) - 2 viene trovato, e la
+    # ricerca completa dimostra che nessun mazzo lo supera
+    best, mazzo, nodi = massimo_esatto(N, miss_set, best=B - 3, testimone=testimone)
+    dt = time.time() - t0
+
+    print(f"N = {N}, MISS_SET = {miss_set}, B(N) = {B}, barriera n = {barriera(miss_set)}")
+    if mazzo is None:
+        print(f"Nessun mazzo supera {B - 3}: F_max <= B(N) - 3")
+    else:
+        print("Sequenza vincente:", mazzo, "  Punteggio:", best, f"(B(N) - {B - best})")
+        print(f"Ricerca completa: F_max = {best}")
+    print(f"Nodi esplorati: {nodi}  Tempo: {dt:.1f}s")
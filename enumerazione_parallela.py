@@ -0,0 +1,245 @@
+# ================================================================
+# Enumerazione esaustiva parallela (V1 su tutti i core, a shard)
+#
+# Descrizione:
+# Stessa ricerca di V1 (tutte le permutazioni distinte del multiset in
+# ordine lessicografico, arresto al primo mazzo che raggiunge il target),
+# ma lo spazio delle permutazioni è diviso in shard deterministici: lo
+# shard s contiene tutte le permutazioni che iniziano con il prefisso di
+# lunghezza P di rango s fra i prefissi distinti del multiset.
+#
+# Rango / "unrank":
+# conta(cnt, m) è il numero di sequenze distinte di lunghezza m ottenibili
+# dalle copie cnt; da qui rank() e unrank() danno la biiezione fra
+# sequenze (prefissi con m = P, mazzi completi con m = L) e indici
+# 0..conta(cnt, m)-1 in ordine lessicografico. Uno shard si rigenera
+# quindi dal solo indice, in qualunque processo e in qualunque momento.
+#
+# Parallelismo:
+# Gli shard vanno a un mp.Pool con chunksize 1: ogni processo libero
+# prende il prossimo shard dalla coda comune (bilanciamento dinamico, che
+# per shard indipendenti equivale al work stealing). Il primo shard che
+# raggiunge il target abbassa un limite condiviso: gli shard successivi
+# vengono saltati (o interrotti), quelli precedenti finiscono comunque,
+# così il risultato è lo stesso mazzo che troverebbe V1 (il primo in
+# ordine lessicografico fra quelli di punteggio massimo).
+#
+# Target:
+# Come in V1 ci si ferma al primo mazzo con punteggio *uguale* al target
+# (try_punt == 58): con un --target più basso del massimo il risultato è
+# il primo mazzo che fa esattamente quel punteggio, anche se prima ce ne
+# sono di migliori. Se nessun mazzo lo fa si restituisce il primo di
+# punteggio massimo.
+#
+# Ripresa:
+# Ogni shard completato viene accodato al file di avanzamento (JSONL);
+# rilanciando con lo stesso file gli shard già fatti vengono saltati.
+# Prefisso e target non indicati si prendono dall'intestazione del file
+# (il prefisso automatico dipende dal numero di processi): si può
+# riprendere con un altro --procs o su un'altra macchina.
+#
+# Uso:
+#   python enumerazione_parallela.py 4
+#   python enumerazione_parallela.py 5 --procs 8 --progresso n5.jsonl
+# ================================================================
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import time
+from math import comb
+
+from more_itertools import distinct_permutations
+
+from enumerazione_dfs import barriera
+from regole import Regole, valutatore
+
+MISS_SET = 4            # come V1
+SHARD_PER_PROC = 64     # prefisso automatico: almeno tanti shard per processo
+CONTROLLO_OGNI = 4096   # permutazioni fra due controlli del limite condiviso
+
+
+# ==========================
+# RANGO DI SEQUENZE DI UN MULTISET
+# ==========================
+
+def conta(cnt, m):
+    # Sequenze distinte di lunghezza m con al più cnt[v] copie del valore v
+    modi = [1] + [0] * m            # modi[j]: sequenze di lunghezza j con i valori visti
+    for c in cnt[1:]:
+        modi = [sum(comb(j, k) * modi[j - k] for k in range(min(c, j) + 1)) for j in range(m + 1)]
+    return modi[m]
+
+
+def rank(seq, cnt):
+    # Indice lessicografico di 'seq' fra le sequenze distinte della sua lunghezza
+    cnt = list(cnt)
+    m = len(seq)
+    r = 0
+    for pos, v in enumerate(seq):
+        for u in range(1, v):
+            if cnt[u]:
+                cnt[u] -= 1
+                r += conta(cnt, m - pos - 1)
+                cnt[u] += 1
+        cnt[v] -= 1
+    return r
+
+
+def unrank(r, cnt, m):
+    # Sequenza di lunghezza m di indice lessicografico r (inverso di rank)
+    cnt = list(cnt)
+    seq = []
+    for pos in range(m):
+        for u in range(1, len(cnt)):
+            if not cnt[u]:
+                continue
+            cnt[u] -= 1
+            n = conta(cnt, m - pos - 1)
+            if r < n:
+                seq.append(u)
+                break
+            r -= n
+            cnt[u] += 1
+    return tuple(seq)
+
+
+# ==========================
+# SHARD
+# ==========================
+
+_limite = None   # primo shard che ha raggiunto il target (memoria condivisa)
+
+
+def _inizializza(limite):
+    global _limite
+    _limite = limite
+
+
+def esplora_shard(args):
+    # Ritorna (s, (punteggio, mazzo)) col primo mazzo dello shard che fa esattamente
+    # 'target' (se non c'è, il primo di punteggio massimo), oppure (s, None) se lo
+    # shard è stato saltato perché non serve più
+    N, P, s, target = args
+    if s > _limite.value:
+        return s, None
+    cnt = [0] + [4] * N
+    prefisso = unrank(s, cnt, P)
+    for v in prefisso:
+        cnt[v] -= 1
+    resto = [v for v in range(1, N + 1) for _ in range(cnt[v])]
+
+    gioca = valutatore(Regole(N, 4, MISS_SET))
+    best, mazzo = -1, None
+    for k, coda in enumerate(distinct_permutations(resto)):
+        if k % CONTROLLO_OGNI == 0 and s > _limite.value:
+            return s, None
+        p = prefisso + coda
+        sc = gioca(p)
+        if sc == target:
+            with _limite.get_lock():
+                if s < _limite.value:
+                    _limite.value = s
+            return s, (sc, p)
+        if sc > best:
+            best, mazzo = sc, p
+    return s, (best, mazzo)
+
+
+def prefisso_automatico(N, n_procs):
+    cnt = [0] + [4] * N
+    P = 0
+    while P < 4 * N and conta(cnt, P) < SHARD_PER_PROC * n_procs:
+        P += 1
+    return P
+
+
+def leggi_intestazione(path):
+    # Parametri della run salvati nella prima riga del file di avanzamento (None se manca)
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        riga = f.readline()
+    return json.loads(riga) if riga.strip() else None
+
+
+def leggi_avanzamento(path, parametri):
+    # Shard già completati: {s: (punteggio, mazzo)}
+    fatti = {}
+    if not path or not os.path.exists(path):
+        return fatti
+    with open(path) as f:
+        righe = [json.loads(r) for r in f if r.strip()]
+    if righe and righe[0] != parametri:
+        raise ValueError(f"{path} è di un'altra run: {righe[0]} invece di {parametri}")
+    for r in righe[1:]:
+        fatti[r["shard"]] = (r["punteggio"], tuple(r["mazzo"]))
+    return fatti
+
+
+def enumera(N, target=None, P=None, n_procs=None, progresso=None):
+    # Ritorna (mazzo, punteggio, shard esplorati in questa run)
+    n_procs = n_procs or mp.cpu_count()
+    salvati = leggi_intestazione(progresso)
+    if salvati is not None and salvati["N"] == N:
+        # Ripresa: stessi shard e stesso target della run interrotta
+        P = salvati["prefisso"] if P is None else P
+        target = salvati["target"] if target is None else target
+    if target is None:
+        # B(N) - 2: da 'barriera' carte in su resta sempre un residuo bloccato da
+        # almeno 2 punti (vedi enumerazione_dfs); sotto, il mazzo può svuotarsi
+        B = 2 * N * (N + 1)
+        target = B - 2 if 4 * N >= barriera(MISS_SET) else B
+    if P is None:
+        P = prefisso_automatico(N, n_procs)
+    n_shard = conta([0] + [4] * N, P)
+    parametri = {"N": N, "miss_set": MISS_SET, "prefisso": P, "target": target}
+
+    fatti = leggi_avanzamento(progresso, parametri)
+    if progresso and (not os.path.exists(progresso) or os.path.getsize(progresso) == 0):
+        with open(progresso, "w") as f:
+            f.write(json.dumps(parametri) + "\n")
+    trovati = [s for s, (sc, _) in fatti.items() if sc == target]
+    limite = mp.Value('q', min(trovati, default=n_shard))
+
+    da_fare = [(N, P, s, target) for s in range(n_shard) if s not in fatti and s <= limite.value]
+    esplorati = 0
+    log = open(progresso, "a") if progresso else None
+    try:
+        with mp.Pool(n_procs, initializer=_inizializza, initargs=(limite,)) as pool:
+            for s, ris in pool.imap_unordered(esplora_shard, da_fare, chunksize=1):
+                if ris is None:
+                    continue
+                fatti[s] = ris
+                esplorati += 1
+                if log is not None:
+                    log.write(json.dumps({"shard": s, "punteggio": ris[0], "mazzo": ris[1]}) + "\n")
+                    log.flush()
+    finally:
+        if log is not None:
+            log.close()
+
+    # Primo shard che ha fatto il target (quelli prima sono finiti senza farlo);
+    # altrimenti il primo mazzo (in ordine lessicografico) di punteggio massimo
+    if limite.value < n_shard:
+        best_s = limite.value
+    else:
+        best_s = min(fatti, key=lambda s: (-fatti[s][0], s))
+    punt, mazzo = fatti[best_s]
+    return mazzo, punt, esplorati
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Enumerazione esaustiva parallela a shard")
+    ap.add_argument("N", type=int)
+    ap.add_argument("--target", type=int, help="punteggio esatto a cui fermarsi, come in V1 (default B(N) - 2)")
+    ap.add_argument("--prefisso", type=int, help="lunghezza del prefisso che definisce gli shard")
+    ap.add_argument("--procs", type=int, help="processi (default: tutti i core)")
+    ap.add_argument("--progresso", help="file di avanzamento per riprendere una run interrotta")
+    args = ap.parse_args()
+
+    t0 = time.time()
+    mazzo, punt, esplorati = enumera(args.N, args.target, args.prefisso, args.procs, args.progresso)
+    print("Sequenza vincente:", mazzo, "  Punteggio:", punt)
+    print(f"Shard esplorati in questa run: {esplorati}  Tempo: {time.time() - t0:.1f}s")
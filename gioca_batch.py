@@ -0,0 +1,92 @@
+# ================================================================
+# Valutatore vettoriale (NumPy) del gioco delle combinazioni
+#
+# Descrizione:
+# gioca_batch() applica le stesse regole di gioca() (soglia MISS_SET,
+# scansione circolare, rotazione dopo ogni presa) a un'intera
+# popolazione di mazzi in una sola chiamata, senza copie di liste,
+# 'del' o slicing per ogni eliminazione.
+#
+# Idea:
+# Dopo una presa in posizione k su un mazzo di lunghezza n, il nuovo
+# mazzo (cancellazione + riordina) è sempre
+#     nuovo[t] = vecchio[(k + 1 + t) % n]     per t = 0..n-2
+# (per k = 0 la rotazione è nulla ma la formula resta valida).
+# Inoltre, fra una presa e la successiva l'indice scorre le posizioni
+# 0, 1, ..., MISS_SET (modulo n): le posizioni lette sono quindi solo le
+# prime min(n, MISS_SET + 1) e la prima che soddisfa arr[k] == k + 1
+# determina la presa. Entrambe le operazioni diventano aritmetica di
+# indici con maschere su tutte le righe insieme.
+#
+# Senza rotazione (Regole.rotazione = False) la presa in k toglie solo la
+# carta: nuovo[t] = vecchio[t] per t < k, vecchio[t + 1] per t >= k.
+# ================================================================
+
+from itertools import chain
+
+import numpy as np
+
+
+def gioca_batch(decks, miss_set=4, rimaste=False, rotazione=True):
+    # decks: array (B, L) oppure lista di tuple della stessa lunghezza.
+    # Ritorna un array int64 di B punteggi, identici a gioca() riga per riga
+    # (con rimaste=True la coppia (punteggi, carte rimaste a fine partita)).
+    if isinstance(decks, np.ndarray):
+        arr = decks.astype(np.int16, copy=True)
+    else:
+        # Lista di tuple: fromiter evita la conversione lenta elemento per elemento
+        decks = list(decks)
+        L = len(decks[0]) if decks else 0
+        arr = np.fromiter(chain.from_iterable(decks), dtype=np.int16,
+                          count=len(decks) * L).reshape(len(decks), L)
+    if arr.ndim != 2:
+        raise ValueError("gioca_batch si aspetta un array 2D (B, L)")
+    B, L = arr.shape
+    punt = np.zeros(B, dtype=np.int64)
+    if B == 0 or L == 0:
+        return (punt, np.full(B, L, dtype=np.int64)) if rimaste else punt
+
+    n = np.full(B, L, dtype=np.int64)        # carte rimaste per ogni mazzo
+    W = min(miss_set + 1, L)                 # ampiezza della finestra di lettura
+    pos = np.arange(W)                       # posizioni logiche lette 0..W-1
+    t = np.arange(L)
+    attivi = np.arange(B)                    # righe ancora in gioco
+
+    while attivi.size:
+        a = arr[attivi]
+        na = n[attivi]
+        # Condizione di presa nella finestra, mascherata sulle carte ancora vive
+        match = (a[:, :W] == pos + 1) & (pos < na[:, None])
+        presa = match.any(axis=1)
+        if not presa.all():
+            # Nessuna presa nelle prime min(n, MISS_SET+1) posizioni: partita finita
+            attivi, a, na, match = attivi[presa], a[presa], na[presa], match[presa]
+            if not attivi.size:
+                break
+        k = match.argmax(axis=1)             # prima posizione che fa presa
+        punt[attivi] += k + 1
+
+        # Cancellazione (+ rotazione) in un'unica gather: nuovo[t] = a[(k+1+t) % n]
+        nn = na - 1
+        if rotazione:
+            idx = (k[:, None] + 1 + t) % na[:, None]
+        else:
+            idx = np.minimum(t + (t >= k[:, None]), L - 1)
+        nuovo = np.take_along_axis(a, idx, axis=1)
+        nuovo[t >= nn[:, None]] = 0          # padding: 0 non fa mai presa
+        arr[attivi] = nuovo
+        n[attivi] = nn
+
+        # I mazzi svuotati escono dal gioco
+        attivi = attivi[nn > 0]
+
+    return (punt, n) if rimaste else punt
+
+
+def miglior_candidato(cands, miss_set=4, rotazione=True):
+    # Valuta un lotto di candidati e restituisce (indice, punteggio) del migliore
+    # (a parità di punteggio vince il primo generato). È il passo di hill_climb_batch
+    # di V2 e V3.
+    scores = gioca_batch(cands, miss_set, rotazione=rotazione)
+    j = int(scores.argmax())
+    return j, int(scores[j])
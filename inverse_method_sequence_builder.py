@@ -0,0 +1,120 @@
+# ================================================================
+# Inverse Method Sequence Builder
+# Sintesi all'indietro di un mazzo ottimale (stato finale (2))
+#
+# Descrizione:
+# Invece di cercare a caso un mazzo che termini con la sola carta 2
+# (punteggio B(N) - 2), si parte dallo stato finale (2) e si "disfa" una
+# presa alla volta finché il mazzo contiene tutto il multiset {1^4..N^4}.
+#
+# Passo inverso:
+# In avanti, da P = (p0, ..., pn) la presa avviene alla prima posizione k
+# con p_k = k + 1 (k < W = MISS_SET + 1) e il mazzo diventa
+#     S = P[k+1:] + P[:k]        (cancellazione + riordina).
+# All'indietro, dato S e un k ammissibile si ricostruisce
+#     P = S[len(S)-k:] + (k + 1,) + S[:len(S)-k]
+# cioè si reinserisce il valore j = k + 1 in posizione j e si annulla la
+# rotazione. Il passo è "sicuro" se nessuna delle k carte davanti fa già
+# presa (p_i != i + 1 per i < k): solo così la partita in avanti sceglie
+# proprio questa presa e ripercorre la sequenza costruita.
+#
+# Ricerca:
+# - DFS dallo stato (2): a ogni passo si prova un valore ancora disponibile
+#   nel multiset (prima quelli con più copie rimaste).
+# - Tabella di trasposizione: gli stati parziali già esplorati senza
+#   successo non vengono riesplorati (le copie rimaste sono determinate
+#   dallo stato stesso).
+# - Potatura sui conteggi: il valore v si può reinserire solo quando il
+#   mazzo ha almeno v - 1 carte; se restano più copie di valori alti di
+#   quante posizioni libere rimangano per inserirle dopo, lo stato è morto.
+#
+# Ogni mazzo prodotto viene rigiocato col valutatore di regole.py per verifica.
+#
+# Uso: python inverse_method_sequence_builder.py 8 13   (N da 8 a 13)
+# ================================================================
+
+import sys
+import time
+
+from regole import Regole, valutatore
+
+
+def passi_inversi(S, W):
+    # Tutti i predecessori sicuri di S: coppie (valore reinserito, P)
+    n = len(S)
+    for k in range(min(n + 1, W)):
+        # Le k carte davanti alla presa sono le ultime k di S
+        davanti = S[n - k:]
+        if any(davanti[i] == i + 1 for i in range(k)):
+            continue
+        yield k + 1, davanti + (k + 1,) + S[:n - k]
+
+
+def costruisci(N, miss_set=None, molteplicita=4, max_nodi=5_000_000):
+    # Restituisce un mazzo completo che termina con lo stato (2), oppure None.
+    if miss_set is None:
+        miss_set = N - 1
+    W = miss_set + 1
+    L = N * molteplicita
+    cnt = [0] + [molteplicita] * N
+    cnt[2] -= 1                            # la carta 2 finale è già nel mazzo
+    visti = set()                          # stati parziali già falliti
+    nodi = 0
+
+    def vivo(n):
+        # Dopo aver raggiunto n carte, il valore v richiede almeno v - 1 carte
+        # nel mazzo: le copie dei valori > n + 1 devono stare negli inserimenti
+        # successivi, che sono al più L - n.
+        alti = 0
+        for v in range(N, 0, -1):
+            if v - 1 <= n:
+                break
+            alti += cnt[v]
+            # Prima di poter inserire v servono v - 1 - n inserimenti di valori più bassi
+            if alti + (v - 1 - n) > L - n:
+                return False
+        return True
+
+    def dfs(S):
+        nonlocal nodi
+        if len(S) == L:
+            return S
+        nodi += 1
+        if nodi > max_nodi or S in visti or not vivo(len(S)):
+            return None
+        scelte = sorted(passi_inversi(S, W), key=lambda x: -cnt[x[0]])
+        for v, P in scelte:
+            if not cnt[v]:
+                continue
+            cnt[v] -= 1
+            ris = dfs(P)
+            cnt[v] += 1
+            if ris is not None:
+                return ris
+        visti.add(S)
+        return None
+
+    limite = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(limite, 4 * L + 100))
+    try:
+        return dfs((2,)), nodi
+    finally:
+        sys.setrecursionlimit(limite)
+
+
+if __name__ == "__main__":
+    N_min = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    N_max = int(sys.argv[2]) if len(sys.argv) > 2 else N_min
+
+    for N in range(N_min, N_max + 1):
+        t0 = time.time()
+        mazzo, nodi = costruisci(N)
+        dt = time.time() - t0
+        B = 2 * N * (N + 1)
+        if mazzo is None:
+            print(f"(n={N}) NESSUN MAZZO TROVATO  nodi: {nodi}  tempo: {dt:.2f}s")
+            continue
+        sc = valutatore(Regole(N, 4, N - 1))(mazzo)     # regole di V3, compilate per N
+        esito = "VERIFICATO" if sc == B - 2 else "ERRORE DI VERIFICA"
+        print(f"(n={N}) {esito}  Punteggio: {sc} (opt - 2 = {B - 2})  nodi: {nodi}  tempo: {dt:.2f}s")
+        print("Sequenza vincente:", mazzo)
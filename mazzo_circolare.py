@@ -0,0 +1,171 @@
+# ================================================================
+# Mazzo circolare senza copie per gioca()
+#
+# Descrizione:
+# In gioca() ogni presa costa una 'del arr[i]' (sposta tutta la coda) e
+# una riordina(arr, i) che costruisce una nuova lista arr[i:] + arr[:i]:
+# una partita è quindi O(L^2) fra allocazioni e spostamenti.
+#
+# MazzoCircolare tiene le carte in un buffer preallocato array('b') e le
+# carte vive in una lista circolare di collegamenti 'succ' (skip-link):
+# - la testa del mazzo è un indice nel buffer: la rotazione dopo una presa
+#   è solo "testa = carta successiva a quella presa" (O(1));
+# - la rimozione scollega la carta (O(1)) senza spostare né riallocare.
+# Fra due prese gioca() legge solo le prime min(n, MISS_SET + 1) carte a
+# partire dalla testa, quindi ogni presa costa O(MISS_SET) invece di O(L).
+#
+# Semantica:
+# gioca_circolare(p, miss_set) restituisce esattamente lo stesso punteggio
+# di gioca() con soglia 'miss <= miss_set' (4 in V1 e Tester, 5 in V2,
+# MISS_SET in V3).
+#
+# Prestazioni:
+# In CPython, per L <= 52, le copie di lista di gioca() sono memmove in C
+# e costano meno dell'overhead per-carta dell'interprete sui collegamenti:
+# su questa taglia gioca() resta più veloce (vedi benchmark). Il mazzo
+# circolare conviene per mazzi molto lunghi o come struttura da portare
+# in codice compilato.
+#
+# Uso da riga di comando: python mazzo_circolare.py  (benchmark L = 28..52)
+# ================================================================
+
+from array import array
+
+
+class MazzoCircolare:
+
+    def __init__(self, capacita):
+        # Buffer allocati una sola volta e riusati da carica()
+        self.val = array('b', bytes(capacita))      # valore di ogni carta
+        self.succ = array('h', bytes(2 * capacita))  # indice della carta viva successiva
+        self._cerchi = {}                           # collegamenti iniziali per ogni lunghezza
+        self.testa = 0                              # carta in posizione logica 0
+        self.coda = 0                               # carta in posizione logica n-1
+        self.n = 0                                  # carte vive
+
+    def carica(self, p):
+        # Copia la sequenza p nel buffer e ricollega tutte le carte in cerchio
+        L = len(p)
+        if L > len(self.val):
+            raise ValueError("mazzo più lungo della capacità del buffer")
+        cerchio = self._cerchi.get(L)
+        if cerchio is None:
+            cerchio = self._cerchi[L] = array('h', list(range(1, L)) + [0] * (L > 0))
+        # Copie a blocchi nei buffer esistenti: nessuna riallocazione
+        self.val[:L] = array('b', p)
+        self.succ[:L] = cerchio
+        self.testa = 0
+        self.coda = L - 1
+        self.n = L
+
+    def __len__(self):
+        return self.n
+
+    def carte(self):
+        # Carte vive in ordine logico (dalla testa), come la lista 'arr' di gioca()
+        out = []
+        c = self.testa
+        for _ in range(self.n):
+            out.append(self.val[c])
+            c = self.succ[c]
+        return out
+
+    def prendi(self, limite):
+        # Cerca la prima posizione logica k < min(n, limite) con valore k + 1.
+        # Se esiste, rimuove la carta, porta la testa sulla successiva (la
+        # rotazione di riordina) e restituisce k + 1; altrimenti restituisce 0.
+        val, succ = self.val, self.succ
+        prec = self.coda
+        c = self.testa
+        for k in range(1, min(self.n, limite) + 1):
+            if val[c] == k:
+                self.n -= 1
+                if self.n:
+                    succ[prec] = succ[c]
+                    self.testa = succ[c]
+                    # Dopo la rotazione l'ultima carta è quella che precedeva la presa
+                    # (per k = 1 non c'è rotazione e la coda resta la stessa)
+                    if k > 1:
+                        self.coda = prec
+                return k
+            prec = c
+            c = succ[c]
+        return 0
+
+
+def gioca_circolare(p, miss_set=4, mazzo=None):
+    # Punteggio di p con le regole di gioca() (soglia 'miss <= miss_set').
+    # 'mazzo' permette di riusare lo stesso buffer fra molte valutazioni.
+    if mazzo is None:
+        mazzo = MazzoCircolare(len(p))
+    mazzo.carica(p)
+    punt = 0
+    limite = miss_set + 1
+    while mazzo.n:
+        k = mazzo.prendi(limite)
+        if not k:
+            break
+        punt += k
+    return punt
+
+
+# ==========================
+# BENCHMARK
+# ==========================
+
+def _gioca_lista(p, miss_set):
+    # Copia di riferimento di gioca() (lista + del + riordina)
+    arr = list(p)
+    punt = 0
+    i = 0
+    miss = 0
+    while arr and miss <= miss_set:
+        if i >= len(arr):
+            i = 0
+        if arr[i] == i + 1:
+            punt += (i + 1)
+            del arr[i]
+            miss = 0
+            if i > 0 and arr:
+                arr = arr[i:] + arr[:i]
+            i = 0
+        else:
+            i = (i + 1) % len(arr) if arr else 0
+            miss += 1
+    return punt
+
+
+def benchmark(valori_N=range(7, 14), ripetizioni=2000, seed=0):
+    # Per L = 4N confronta gioca() su lista con gioca_circolare su mazzi casuali
+    # e su un mazzo "lungo" (tutte carte 1: L prese in posizione 0).
+    import random
+    import time
+
+    rng = random.Random(seed)
+    righe = []
+    for N in valori_N:
+        L = 4 * N
+        miss_set = N - 1
+        base = [v for v in range(1, N + 1) for _ in range(4)]
+        casuali = []
+        for _ in range(ripetizioni):
+            rng.shuffle(base)
+            casuali.append(tuple(base))
+        lungo = tuple([1] * L)
+        mazzo = MazzoCircolare(L)
+
+        for nome, decks in (("casuali", casuali), ("lungo", [lungo] * ripetizioni)):
+            t0 = time.perf_counter()
+            ref = [_gioca_lista(d, miss_set) for d in decks]
+            t1 = time.perf_counter()
+            new = [gioca_circolare(d, miss_set, mazzo) for d in decks]
+            t2 = time.perf_counter()
+            assert ref == new
+            righe.append((L, nome, (t1 - t0) / len(decks) * 1e6, (t2 - t1) / len(decks) * 1e6))
+    return righe
+
+
+if __name__ == "__main__":
+    print(f"{'L':>3} {'mazzi':>8} {'lista us':>9} {'circ. us':>9}")
+    for L, nome, t_lista, t_circ in benchmark():
+        print(f"{L:>3} {nome:>8} {t_lista:>9.2f} {t_circ:>9.2f}")
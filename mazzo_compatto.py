@@ -0,0 +1,184 @@
+# ================================================================
+# Mazzi compatti (4 bit per carta) e archivio su file mappato in memoria
+#
+# Descrizione:
+# Un mazzo come tupla di int costa ~8 byte a carta di puntatori più
+# l'oggetto tupla, e va serializzato con pickle a ogni passaggio fra
+# processi. Con N <= 15 ogni carta sta in 4 bit (0 resta libero):
+#
+# - impacca / spacchetta: tupla <-> bytes a larghezza fissa ceil(L / 2),
+#   due carte per byte (prima carta nel nibble basso);
+# - impacca_u64 / spacchetta_u64: per L <= 16 lo stesso mazzo come un
+#   solo intero a 64 bit (utile come chiave o in un array('Q')).
+#
+# Archivio:
+# Un file append-only di record a lunghezza fissa
+#     intestazione: magic b"MZPK", L (uint16)
+#     record:       punteggio int16 + mazzo impaccato (ceil(L / 2) byte)
+# - ScrittoreMazzi: ogni aggiungi() è una sola write() su un file aperto
+#   in O_APPEND, quindi più worker possono scrivere sullo stesso file
+#   senza lock (i record non si mescolano).
+# - LettoreMazzi: mappa il file con mmap e legge i record senza copiarlo;
+#   come_numpy() restituisce una vista NumPy strutturata (zero-copy) se
+#   NumPy è installato. La vista è legata alla mappa da cui è nata: vede
+#   i record presenti in quel momento e resta valida anche dopo
+#   aggiorna() o chiudi(), che in quel caso lasciano la vecchia mappa al
+#   garbage collector invece di chiuderla (close() darebbe BufferError).
+#
+# Uso: python mazzo_compatto.py risultati.mzpk [top]
+# ================================================================
+
+import mmap
+import os
+import struct
+import sys
+from collections import Counter
+
+MAGIC = b"MZPK"
+INTESTAZIONE = struct.Struct("<4sH")    # magic, lunghezza mazzo
+PUNTEGGIO = struct.Struct("<h")
+
+# Byte -> (carta nel nibble basso, carta nel nibble alto)
+_COPPIE = [(b & 15, b >> 4) for b in range(256)]
+
+
+def larghezza(L):
+    # Byte occupati da un mazzo di L carte
+    return (L + 1) // 2
+
+
+def impacca(seq):
+    if not all(0 < v < 16 for v in seq):
+        raise ValueError("ogni carta deve valere fra 1 e 15 per stare in 4 bit")
+    s = list(seq)
+    if len(s) % 2:
+        s.append(0)
+    return bytes(s[i] | (s[i + 1] << 4) for i in range(0, len(s), 2))
+
+
+def spacchetta(dati, L):
+    out = []
+    for b in dati:
+        out.extend(_COPPIE[b])
+    return tuple(out[:L])
+
+
+def impacca_u64(seq):
+    if len(seq) > 16:
+        raise ValueError("un mazzo di più di 16 carte non sta in 64 bit")
+    return int.from_bytes(impacca(seq), "little")
+
+
+def spacchetta_u64(x, L):
+    return spacchetta(x.to_bytes(8, "little"), L)
+
+
+# ==========================
+# ARCHIVIO SU FILE
+# ==========================
+
+class ScrittoreMazzi:
+
+    def __init__(self, path, L):
+        self.L = L
+        self.record = struct.Struct(f"<h{larghezza(L)}s")
+        # Solo il primo che crea il file scrive l'intestazione (O_EXCL)
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+            os.write(fd, INTESTAZIONE.pack(MAGIC, L))
+            os.close(fd)
+        except FileExistsError:
+            with open(path, "rb") as f:
+                magic, L_file = INTESTAZIONE.unpack(f.read(INTESTAZIONE.size))
+            if magic != MAGIC or L_file != L:
+                raise ValueError(f"{path}: non è un archivio di mazzi da {L} carte")
+        self.fd = os.open(path, os.O_WRONLY | os.O_APPEND)
+
+    def _impacca(self, sc, seq):
+        # Record di un mazzo: la struct a lunghezza fissa troncherebbe o riempirebbe
+        # in silenzio un mazzo di lunghezza diversa da L
+        if len(seq) != self.L:
+            raise ValueError(f"mazzo da {len(seq)} carte in un archivio da {self.L}")
+        return self.record.pack(sc, impacca(seq))
+
+    def aggiungi(self, sc, seq):
+        os.write(self.fd, self._impacca(sc, seq))
+
+    def aggiungi_molti(self, coppie):
+        # Più record con una sola write() (nessuno se un mazzo non è valido)
+        os.write(self.fd, b"".join([self._impacca(sc, seq) for sc, seq in coppie]))
+
+    def chiudi(self):
+        os.close(self.fd)
+
+
+class LettoreMazzi:
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, self.L = INTESTAZIONE.unpack(f.read(INTESTAZIONE.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path}: non è un archivio di mazzi")
+        self.passo = PUNTEGGIO.size + larghezza(self.L)
+        self.mm = None
+        self.aggiorna()
+
+    def aggiorna(self):
+        # Rimappa il file per vedere i record aggiunti dagli scrittori nel frattempo
+        self._rilascia()
+        with open(self.path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # Un record ancora in scrittura (incompleto) non viene contato
+        self.n = (len(self.mm) - INTESTAZIONE.size) // self.passo
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.n:
+            raise IndexError(i)
+        off = INTESTAZIONE.size + i * self.passo
+        (sc,) = PUNTEGGIO.unpack_from(self.mm, off)
+        return sc, spacchetta(self.mm[off + PUNTEGGIO.size:off + self.passo], self.L)
+
+    def __iter__(self):
+        for i in range(self.n):
+            yield self[i]
+
+    def punteggio(self, i):
+        return PUNTEGGIO.unpack_from(self.mm, INTESTAZIONE.size + i * self.passo)[0]
+
+    def come_numpy(self):
+        # Vista strutturata (punteggio, mazzo impaccato) sul file mappato, senza copie.
+        # Vede solo i record già presenti: dopo aggiorna() serve una nuova vista.
+        import numpy as np
+        tipo = np.dtype([("punteggio", "<i2"), ("mazzo", "u1", (larghezza(self.L),))])
+        return np.frombuffer(self.mm, dtype=tipo, count=self.n, offset=INTESTAZIONE.size)
+
+    def _rilascia(self):
+        # Chiude la mappa corrente; se una vista di come_numpy() la usa ancora la
+        # si abbandona: viene smappata quando l'ultima vista viene liberata
+        if self.mm is not None:
+            try:
+                self.mm.close()
+            except BufferError:
+                pass
+            self.mm = None
+
+    def chiudi(self):
+        self._rilascia()
+
+
+if __name__ == "__main__":
+    lettore = LettoreMazzi(sys.argv[1])
+    top = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    print(f"{len(lettore)} mazzi da {lettore.L} carte")
+    conteggi = Counter(lettore.punteggio(i) for i in range(len(lettore)))
+    for sc in sorted(conteggi, reverse=True):
+        print(f"  punteggio {sc}: {conteggi[sc]}")
+    migliori = sorted(range(len(lettore)), key=lettore.punteggio, reverse=True)[:top]
+    for i in migliori:
+        sc, seq = lettore[i]
+        print(sc, seq)
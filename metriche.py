@@ -0,0 +1,189 @@
+# ================================================================
+# Strumentazione della ricerca parallela (opzionale)
+#
+# Descrizione:
+# - Metriche: contatori locali al worker (valutazioni, mosse proposte e
+#   accettate per tipo, restart, tempo in gioca() e nella generazione
+#   delle mosse). Vengono aggregati nel processo e inviati al master a
+#   lotti, al più uno ogni 'ogni' secondi, su una mp.Queue: il costo per
+#   passo di hill climbing è qualche somma fra interi e due perf_counter().
+# - FlussoMetriche: lato master, scrive ogni lotto ricevuto come riga JSONL
+#   e stampa periodicamente una riga di riepilogo (valutazioni/s totali e
+#   per worker, tassi di accettazione). Ogni lotto porta il suo
+#   'ritardo_raccolta': secondi fra l'invio del worker e il momento in cui
+#   il master svuota la coda. Il master la svuota solo ogni
+#   METRICHE_OGNI secondi, quindi il ritardo misura soprattutto quell'attesa
+#   e non il trasporto sulla coda.
+# - Campionatore: profiler a campionamento per un singolo worker. Un timer
+#   ITIMER_PROF interrompe il processo ogni 'intervallo' secondi di CPU e
+#   registra lo stack Python corrente; all'uscita scrive gli stack nel
+#   formato "collassato" (f1;f2;f3 conteggio) letto da flamegraph.pl e
+#   speedscope. Solo Unix (signal.setitimer).
+# ================================================================
+
+import json
+import os
+import queue
+import signal
+import time
+from collections import Counter
+
+SWAP, BLOCCO = 0, 1
+NOMI_MOSSE = ("swap", "blocco")
+
+
+class Metriche:
+
+    def __init__(self, worker, coda, ogni=5.0):
+        self.worker = worker
+        self.coda = coda
+        self.ogni = ogni
+        self.ultimo_invio = time.perf_counter()
+        self.azzera()
+
+    def azzera(self):
+        self.valutazioni = 0
+        self.proposte = [0, 0]
+        self.accettate = [0, 0]
+        self.restart = 0
+        self.t_gioca = 0.0
+        self.t_mosse = 0.0
+
+    def passo(self, tipo, accettata, t_mossa, t_gioca=None):
+        # Un passo di hill climbing: mossa di tipo SWAP/BLOCCO, valutata una volta
+        # (t_gioca=None: mossa applicata senza valutarla)
+        self.proposte[tipo] += 1
+        self.accettate[tipo] += accettata
+        self.t_mosse += t_mossa
+        if t_gioca is not None:
+            self.valutazioni += 1
+            self.t_gioca += t_gioca
+
+    def lotto(self, tipi, accettato, t_mossa, t_gioca):
+        # Un lotto di candidati valutati insieme; 'accettato' è l'indice scelto o None
+        self.valutazioni += len(tipi)
+        for tipo in tipi:
+            self.proposte[tipo] += 1
+        if accettato is not None:
+            self.accettate[tipi[accettato]] += 1
+        self.t_mosse += t_mossa
+        self.t_gioca += t_gioca
+
+    def fine_restart(self):
+        self.restart += 1
+        if time.perf_counter() - self.ultimo_invio >= self.ogni:
+            self.invia()
+
+    def invia(self, fine=False):
+        ora = time.perf_counter()
+        self.coda.put({
+            "worker": self.worker, "t_invio": time.time(), "durata": ora - self.ultimo_invio,
+            "valutazioni": self.valutazioni, "restart": self.restart,
+            "proposte": dict(zip(NOMI_MOSSE, self.proposte)),
+            "accettate": dict(zip(NOMI_MOSSE, self.accettate)),
+            "t_gioca": self.t_gioca, "t_mosse": self.t_mosse, "fine": fine,
+        })
+        self.ultimo_invio = ora
+        self.azzera()
+
+
+class FlussoMetriche:
+
+    def __init__(self, path, n_procs, ogni=5.0):
+        self.f = open(path, "a") if path else None
+        self.n_procs = n_procs
+        self.ogni = ogni
+        self.t0 = time.time()
+        self.ultimo_riepilogo = self.t0
+        self.finali = 0
+        # Totali dall'ultimo riepilogo, per worker
+        self.valutazioni = Counter()
+        self.proposte = Counter()
+        self.accettate = Counter()
+        self.restart = 0
+        self.t_gioca = 0.0
+        self.t_mosse = 0.0
+
+    def scrivi(self, tipo, **campi):
+        if self.f is not None:
+            self.f.write(json.dumps({"tipo": tipo, "t": round(time.time() - self.t0, 3), **campi}) + "\n")
+            self.f.flush()
+
+    def ricevi(self, lotto):
+        lotto["ritardo_raccolta"] = time.time() - lotto.pop("t_invio")
+        self.scrivi("worker", **lotto)
+        self.valutazioni[lotto["worker"]] += lotto["valutazioni"]
+        self.proposte.update(lotto["proposte"])
+        self.accettate.update(lotto["accettate"])
+        self.restart += lotto["restart"]
+        self.t_gioca += lotto["t_gioca"]
+        self.t_mosse += lotto["t_mosse"]
+        self.finali += lotto["fine"]
+
+    def svuota(self, coda):
+        # Legge tutti i lotti già in coda senza bloccarsi
+        while True:
+            try:
+                self.ricevi(coda.get_nowait())
+            except queue.Empty:
+                return
+
+    def attendi_finali(self, coda, timeout=5.0):
+        # A fine run: aspetta l'ultimo lotto di ogni worker
+        while self.finali < self.n_procs:
+            try:
+                self.ricevi(coda.get(timeout=timeout))
+            except queue.Empty:     # un worker è morto senza inviarlo
+                return
+
+    def forse_riepilogo(self, forza=False):
+        ora = time.time()
+        dt = ora - self.ultimo_riepilogo
+        if not forza and dt < self.ogni:
+            return
+        tot = sum(self.valutazioni.values())
+        tassi = {m: self.accettate[m] / self.proposte[m] if self.proposte[m] else 0.0 for m in NOMI_MOSSE}
+        per_worker = {r: round(v / dt) for r, v in sorted(self.valutazioni.items())}
+        quota_gioca = self.t_gioca / (self.t_gioca + self.t_mosse) if self.t_gioca + self.t_mosse else 0.0
+        print(f"[metriche {ora - self.t0:7.1f}s] {tot / dt:,.0f} val/s  restart {self.restart}  "
+              f"acc. swap {tassi['swap']:.1%} blocco {tassi['blocco']:.1%}  "
+              f"gioca {quota_gioca:.0%} del passo  per worker {per_worker}")
+        self.scrivi("riepilogo", valutazioni_s=tot / dt, per_worker=per_worker, accettazione=tassi,
+                    restart=self.restart, quota_gioca=quota_gioca)
+        self.ultimo_riepilogo = ora
+        self.valutazioni.clear()
+        self.proposte.clear()
+        self.accettate.clear()
+        self.restart = 0
+        self.t_gioca = self.t_mosse = 0.0
+
+    def chiudi(self):
+        if self.f is not None:
+            self.f.close()
+
+
+class Campionatore:
+
+    def __init__(self, path, intervallo=0.005):
+        self.path = path
+        self.intervallo = intervallo
+        self.stack = Counter()
+
+    def _campiona(self, signum, frame):
+        nomi = []
+        while frame is not None:
+            codice = frame.f_code
+            nomi.append(f"{codice.co_name} ({os.path.basename(codice.co_filename)}:{codice.co_firstlineno})")
+            frame = frame.f_back
+        self.stack[";".join(reversed(nomi))] += 1
+
+    def avvia(self):
+        signal.signal(signal.SIGPROF, self._campiona)
+        signal.setitimer(signal.ITIMER_PROF, self.intervallo, self.intervallo)
+
+    def ferma(self):
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, signal.SIG_DFL)
+        with open(self.path, "w") as f:
+            for stack, n in self.stack.most_common():
+                f.write(f"{stack} {n}\n")
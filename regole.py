@@ -0,0 +1,81 @@
+# ================================================================
+# Regole del gioco e valutatori compilati per configurazione
+#
+# Descrizione:
+# V1, V2, V3 e Tester.py avevano ciascuno la propria copia di riordina()
+# e gioca(), diverse solo per le costanti (soglia di mancate 4, 5 o
+# MISS_SET; 4 copie per valore scritte in 'base'). Qui:
+#
+# - Regole(N, molteplicita, miss_set, rotazione): la configurazione, con
+#   il mazzo base e il punteggio massimo B = molteplicita * N(N+1)/2;
+# - valutatore(regole): costruisce (e tiene in cache) una funzione
+#   gioca(p) specializzata per quella configurazione.
+#
+# Specializzazione:
+# Fra due prese gioca() legge solo le posizioni 0..min(n, miss_set+1)-1
+# e la carta in posizione k fa presa solo se vale k + 1 <= N: le posizioni
+# da controllare sono quindi al più W = min(miss_set + 1, N), costante per
+# la configurazione. Il sorgente generato srotola questi W controlli in
+# una catena di if/elif, ciascuno con il proprio aggiornamento già scritto
+# (punteggio costante, cancellazione + riordina come un'unica rotazione
+# con indici costanti, oppure solo cancellazione se la rotazione è
+# spenta): nel ciclo interno non restano né contatori di mancate né
+# controlli sulle regole. Il risultato è identico a gioca() di V1/V3.
+#
+# Con finale=True la funzione ritorna (punteggio, carte rimaste).
+# ================================================================
+
+from collections import namedtuple
+from functools import lru_cache
+
+
+def riordina(arr, i):
+    # Ruota l'array spostando i primi i elementi in coda.
+    if i <= 0:
+        return arr
+    return arr[i:] + arr[:i]
+
+
+class Regole(namedtuple("Regole", "N molteplicita miss_set rotazione", defaults=(4, 4, True))):
+    __slots__ = ()
+
+    @property
+    def base(self):
+        # Mazzo ordinato {1^m, ..., N^m}
+        return [v for v in range(1, self.N + 1) for _ in range(self.molteplicita)]
+
+    @property
+    def massimo(self):
+        # B(N): punteggio se tutte le carte venissero prese
+        return self.molteplicita * self.N * (self.N + 1) // 2
+
+
+def sorgente(regole, finale=False):
+    # Sorgente Python della funzione di punteggio specializzata per 'regole'
+    W = min(regole.miss_set + 1, regole.N)
+    righe = ["def gioca(p):",
+             "    arr = list(p)",
+             "    punt = 0",
+             "    while arr:"]
+    if W > 1:
+        righe.append("        n = len(arr)")
+    for k in range(W):
+        cond = f"arr[{k}] == {k + 1}" if k == 0 else f"n > {k} and arr[{k}] == {k + 1}"
+        righe.append(f"        {'if' if k == 0 else 'elif'} {cond}:")
+        righe.append(f"            punt += {k + 1}")
+        if k == 0 or not regole.rotazione:
+            righe.append(f"            del arr[{k}]")
+        else:
+            righe.append(f"            arr = arr[{k + 1}:] + arr[:{k}]")
+    righe += ["        else:",
+              "            break",
+              "    return punt, arr" if finale else "    return punt"]
+    return "\n".join(righe) + "\n"
+
+
+@lru_cache(maxsize=None)
+def valutatore(regole, finale=False):
+    # Funzione gioca(p) compilata per 'regole' (una sola volta per configurazione)
+    spazio = {}
+    exec(compile(sorgente(regole, finale), f"<gioca {tuple(regole)}>", "exec"), spazio)
+    return spazio["gioca"]
@@ -0,0 +1,370 @@
+# ================================================================
+# Ricerca distribuita su più macchine: coordinatore e worker via TCP
+#
+# Descrizione:
+# parallel_search di V3 usa solo mp.Process sulla macchina locale. Per
+# N = 9, 10 servono più core: qui un piccolo coordinatore distribuisce il
+# lavoro a worker che possono girare su altri host.
+#
+# Unità di lavoro:
+# La ricerca è divisa in n_unita unità; l'unità u è "restart casuali +
+# hill_climb di V3" per 'restart' restart con seme (seme + u). Un'unità
+# rigiocata da un altro worker dà quindi lo stesso risultato.
+#
+# Protocollo (una riga JSON per messaggio, campo "tipo"):
+#   worker -> coordinatore: ciao, richiesta, battito, best, fatto, errore
+#   coordinatore -> worker: config (regole, target e parametri di V3),
+#                           unita, attendi, stop
+# Ogni worker chiede un'unità, la esegue inviando i miglioramenti (best)
+# e un battito ogni BATTITO secondi fra un restart e l'altro, poi invia
+# 'fatto' e ne chiede un'altra. Il coordinatore ricontrolla ogni best col
+# valutatore di regole.py prima di accettarlo.
+#
+# Arresto e unità perse:
+# Appena un best raggiunge il target il coordinatore invia 'stop' a tutti
+# (i worker lo leggono fra un restart e l'altro). Se un worker chiude la
+# connessione o resta muto per più di TIMEOUT secondi, le sue unità non
+# finite tornano in testa alla coda e vengono riassegnate. Un worker che
+# fallisce con un'eccezione la invia ('errore') prima di chiudere. In
+# modo locale, se muoiono tutti i processi worker con unità ancora da
+# fare, il coordinatore si ferma con un errore invece di aspettare
+# worker che non arriveranno più.
+#
+# Uso:
+#   python ricerca_rete.py coordinatore --porta 5050 --n 9 --restart 20 --unita 5000
+#   python ricerca_rete.py worker host:5050 --procs 16        (su ogni macchina)
+#   python ricerca_rete.py locale --procs 4 --n 6             (tutto in loopback)
+# ================================================================
+
+import argparse
+import json
+import multiprocessing as mp
+import random
+import selectors
+import socket
+import time
+import traceback
+from collections import deque
+
+from benchmark import carica_v3, configura_v3
+from regole import Regole, valutatore
+
+BATTITO = 5.0           # secondi fra due battiti di un worker
+TIMEOUT = 30.0          # secondi di silenzio dopo i quali un worker è considerato perso
+ATTESA = 1.0            # secondi che un worker aspetta se non ci sono unità libere
+ATTESA_CHIUSURA = 10.0  # secondi concessi ai worker per chiudere dopo lo stop
+
+
+class Canale:
+    # Messaggi JSON, uno per riga, su un socket TCP
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.buf = b""
+        self.coda = deque()
+
+    def invia(self, **msg):
+        self.sock.sendall((json.dumps(msg) + "\n").encode())
+
+    def leggi(self):
+        # Una sola recv (il socket è pronto): ritorna i messaggi completi arrivati
+        dati = self.sock.recv(65536)
+        if not dati:
+            raise ConnectionError("connessione chiusa")
+        self.buf += dati
+        *righe, self.buf = self.buf.split(b"\n")
+        return [json.loads(r) for r in righe if r.strip()]
+
+    def ricevi(self, timeout=None):
+        # Prossimo messaggio, aspettando al più 'timeout' secondi (None = senza limite)
+        fine = None if timeout is None else time.monotonic() + timeout
+        while not self.coda:
+            resto = None if fine is None else max(0.0, fine - time.monotonic())
+            pronti = selectors.DefaultSelector()
+            pronti.register(self.sock, selectors.EVENT_READ)
+            try:
+                if not pronti.select(resto):
+                    return None
+            finally:
+                pronti.close()
+            self.coda.extend(self.leggi())
+        return self.coda.popleft()
+
+    def chiudi(self):
+        self.sock.close()
+
+
+# ==========================
+# COORDINATORE
+# ==========================
+
+class Coordinatore:
+
+    def __init__(self, host, porta, N, miss_set, target, restart, n_unita, seme=0,
+                 parametri=None, timeout=TIMEOUT):
+        self.config = {"N": N, "miss_set": miss_set, "target": target, "parametri": parametri or {}}
+        self.target = target
+        self.restart = restart
+        self.n_unita = n_unita
+        self.seme = seme
+        self.timeout = timeout
+        self.gioca = valutatore(Regole(N, 4, miss_set))
+        self.base = sorted(Regole(N, 4, miss_set).base)
+        self.da_fare = deque(range(n_unita))
+        self.assegnate = {}         # unità -> canale del worker che la sta eseguendo
+        self.fatte = set()
+        self.worker = {}            # canale -> {"nome", "visto", "unita"}
+        self.best_sc, self.best_seq = -1, None
+        self.restart_fatti = 0
+        self.stop = False
+        self.processi = []          # worker locali (modo locale): se muoiono tutti si esce
+        self.errori = []            # eccezioni inviate dai worker
+        self.sel = selectors.DefaultSelector()
+        self.server = socket.create_server((host, porta))
+        self.server.setblocking(False)
+        self.sel.register(self.server, selectors.EVENT_READ)
+        self.porta = self.server.getsockname()[1]
+
+    def servi(self):
+        # Loop del coordinatore; ritorna (best_seq, best_sc)
+        t0 = time.time()
+        t_stop = None
+        try:
+            while True:
+                for chiave, _ in self.sel.select(timeout=1.0):
+                    if chiave.fileobj is self.server:
+                        self.accetta()
+                    else:
+                        self.ricevi(chiave.data)
+                ora = time.monotonic()
+                for canale, w in list(self.worker.items()):
+                    if ora - w["visto"] > self.timeout:
+                        print(f"[coordinatore] {w['nome']} muto da {ora - w['visto']:.0f}s: disconnesso")
+                        self.perdi(canale)
+                if not self.stop and len(self.fatte) == self.n_unita:
+                    print(f"[coordinatore] tutte le {self.n_unita} unità completate")
+                    self.ferma()
+                if (not self.stop and self.processi
+                        and not any(p.is_alive() for p in self.processi)):
+                    ultimo = self.errori[-1] if self.errori else "nessun errore ricevuto"
+                    raise RuntimeError(f"tutti i worker locali sono terminati con "
+                                       f"{self.n_unita - len(self.fatte)} unità da fare; "
+                                       f"ultimo errore:\n{ultimo}")
+                if self.stop:
+                    t_stop = t_stop or time.monotonic()
+                    if not self.worker or time.monotonic() - t_stop > ATTESA_CHIUSURA:
+                        break
+        finally:
+            for canale in list(self.worker):
+                self.perdi(canale, silenzioso=True)
+            self.sel.close()
+            self.server.close()
+        print(f"[coordinatore] best {self.best_sc}/{self.target}, {len(self.fatte)}/{self.n_unita} unità, "
+              f"{self.restart_fatti} restart in {time.time() - t0:.1f}s")
+        return self.best_seq, self.best_sc
+
+    def accetta(self):
+        sock, indirizzo = self.server.accept()
+        canale = Canale(sock)
+        self.worker[canale] = {"nome": f"{indirizzo[0]}:{indirizzo[1]}", "visto": time.monotonic(),
+                               "unita": set()}
+        self.sel.register(sock, selectors.EVENT_READ, canale)
+        canale.invia(tipo="config", **self.config)
+
+    def ricevi(self, canale):
+        try:
+            messaggi = canale.leggi()
+        except (ConnectionError, OSError, ValueError):
+            self.perdi(canale)
+            return
+        w = self.worker[canale]
+        w["visto"] = time.monotonic()
+        try:
+            for msg in messaggi:
+                self.gestisci(canale, w, msg)
+        except OSError:
+            self.perdi(canale)
+
+    def gestisci(self, canale, w, msg):
+        tipo = msg["tipo"]
+        if tipo == "ciao":
+            w["nome"] = msg.get("nome", w["nome"])
+            print(f"[coordinatore] collegato {w['nome']}")
+        elif tipo == "richiesta":
+            if self.stop:
+                canale.invia(tipo="stop")
+            elif self.da_fare:
+                u = self.da_fare.popleft()
+                self.assegnate[u] = canale
+                w["unita"].add(u)
+                canale.invia(tipo="unita", id=u, seme=self.seme + u, restart=self.restart)
+            else:
+                # Unità tutte assegnate: qualcuna può ancora tornare in coda
+                canale.invia(tipo="attendi", secondi=ATTESA)
+        elif tipo == "best":
+            seq, sc = tuple(msg["mazzo"]), msg["punteggio"]
+            if self.gioca(seq) != sc or sorted(seq) != self.base:
+                print(f"[coordinatore] best non valido da {w['nome']}: ignorato")
+                return
+            if sc > self.best_sc:
+                self.best_sc, self.best_seq = sc, seq
+                print(f"[Aggiornamento:] nuovo best globale: {sc}/{self.target} (da {w['nome']})")
+            if sc >= self.target and not self.stop:
+                print(f"[SUCCESSO!] raggiunto target {self.target}")
+                self.ferma()
+        elif tipo == "errore":
+            self.errori.append(msg["messaggio"])
+            print(f"[coordinatore] errore da {w['nome']}:\n{msg['messaggio']}")
+        elif tipo == "fatto":
+            u = msg["id"]
+            w["unita"].discard(u)
+            if u not in self.fatte:
+                self.fatte.add(u)
+                self.restart_fatti += msg["restart"]
+            if self.assegnate.get(u) is canale:
+                del self.assegnate[u]
+        # "battito": basta aver aggiornato w["visto"]
+
+    def ferma(self):
+        # Stop a tutti i worker collegati
+        self.stop = True
+        for canale in list(self.worker):
+            try:
+                canale.invia(tipo="stop")
+            except OSError:
+                self.perdi(canale)
+
+    def perdi(self, canale, silenzioso=False):
+        # Chiude la connessione e rimette in coda le unità non finite del worker
+        w = self.worker.pop(canale, None)
+        if w is None:
+            return
+        self.sel.unregister(canale.sock)
+        canale.chiudi()
+        for u in sorted(w["unita"], reverse=True):
+            if u not in self.fatte and self.assegnate.get(u) is canale:
+                del self.assegnate[u]
+                self.da_fare.appendleft(u)
+                if not (silenzioso or self.stop):
+                    print(f"[coordinatore] unità {u} di {w['nome']} riassegnata")
+
+
+# ==========================
+# WORKER
+# ==========================
+
+def worker(host, porta, nome=None):
+    # Esegue unità finché il coordinatore non invia stop (o chiude la connessione)
+    canale = Canale(socket.create_connection((host, porta)))
+    try:
+        canale.invia(tipo="ciao", nome=nome or f"{socket.gethostname()}:{mp.current_process().pid}")
+        cfg = canale.ricevi()
+        v3 = carica_v3()
+        for k, v in cfg["parametri"].items():
+            setattr(v3, k, v)
+        configura_v3(v3, cfg["N"], cfg["miss_set"], cfg["target"])
+        target = cfg["target"]
+        best = -1
+        t_battito = time.monotonic()
+        while True:
+            canale.invia(tipo="richiesta")
+            msg = canale.ricevi()
+            if msg["tipo"] == "stop":
+                return
+            if msg["tipo"] == "attendi":
+                if (canale.ricevi(msg["secondi"]) or {}).get("tipo") == "stop":
+                    return
+                continue
+            random.seed(msg["seme"])
+            fatti = 0
+            for _ in range(msg["restart"]):
+                # Fra un restart e l'altro: stop dal coordinatore e battito
+                arrivato = canale.ricevi(0)
+                if arrivato is not None and arrivato["tipo"] == "stop":
+                    return
+                if time.monotonic() - t_battito >= BATTITO:
+                    canale.invia(tipo="battito", id=msg["id"])
+                    t_battito = time.monotonic()
+                cand, sc = v3.hill_climb(v3.random_perm(v3.base), iters=v3.HC_ITERS, target=target,
+                                         batch=v3.HC_BATCH)
+                fatti += 1
+                if sc > best:
+                    best = sc
+                    canale.invia(tipo="best", id=msg["id"], punteggio=sc, mazzo=list(cand))
+                if sc >= target:
+                    break
+            canale.invia(tipo="fatto", id=msg["id"], restart=fatti)
+    except (ConnectionError, OSError):
+        pass    # coordinatore chiuso: le unità in corso vengono riassegnate da lui
+    except Exception:
+        # Qualunque altro errore arriva al coordinatore prima di chiudere
+        try:
+            canale.invia(tipo="errore", messaggio=traceback.format_exc())
+        except OSError:
+            pass
+        raise
+    finally:
+        canale.chiudi()
+
+
+def avvia_worker(host, porta, n_procs):
+    procs = [mp.Process(target=worker, args=(host, porta)) for _ in range(n_procs)]
+    for p in procs:
+        p.start()
+    return procs
+
+
+def indirizzo(testo):
+    host, _, porta = testo.rpartition(":")
+    return host or "127.0.0.1", int(porta)
+
+
+def parametro(testo):
+    # "HC_ITERS=2000" -> ("HC_ITERS", 2000); valore JSON o stringa
+    nome, _, valore = testo.partition("=")
+    try:
+        return nome.strip(), json.loads(valore)
+    except ValueError:
+        return nome.strip(), valore
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Ricerca distribuita via TCP (coordinatore / worker)")
+    sub = ap.add_subparsers(dest="modo", required=True)
+    for modo in ("coordinatore", "locale"):
+        c = sub.add_parser(modo)
+        c.add_argument("--host", default="0.0.0.0" if modo == "coordinatore" else "127.0.0.1")
+        c.add_argument("--porta", type=int, default=5050 if modo == "coordinatore" else 0)
+        c.add_argument("--n", type=int, default=5)
+        c.add_argument("--miss", type=int, help="MISS_SET (default N - 1)")
+        c.add_argument("--target", type=int, help="default 2N(N+1) - 2")
+        c.add_argument("--restart", type=int, default=20, help="restart per unità")
+        c.add_argument("--unita", type=int, default=1000, help="numero di unità di lavoro")
+        c.add_argument("--seme", type=int, default=0, help="l'unità u usa il seme SEME + u")
+        c.add_argument("--param", type=parametro, action="append", default=[],
+                       help="parametro di V3 per i worker, es. HC_ITERS=7500 (ripetibile)")
+        c.add_argument("--timeout", type=float, default=TIMEOUT, help="secondi senza battito")
+        if modo == "locale":
+            c.add_argument("--procs", type=int, default=mp.cpu_count(), help="worker in loopback")
+    w = sub.add_parser("worker")
+    w.add_argument("coordinatore", type=indirizzo, help="host:porta del coordinatore")
+    w.add_argument("--procs", type=int, default=mp.cpu_count())
+    args = ap.parse_args()
+
+    if args.modo == "worker":
+        for p in avvia_worker(*args.coordinatore, args.procs):
+            p.join()
+    else:
+        miss = args.miss if args.miss is not None else args.n - 1
+        target = args.target if args.target is not None else Regole(args.n, 4, miss).massimo - 2
+        coord = Coordinatore(args.host, args.porta, args.n, miss, target, args.restart, args.unita,
+                             args.seme, dict(args.param), args.timeout)
+        print(f"[coordinatore] in ascolto su {args.host}:{coord.porta}")
+        procs = avvia_worker("127.0.0.1", coord.porta, args.procs) if args.modo == "locale" else []
+        coord.processi = procs
+        seq, sc = coord.servi()
+        for p in procs:
+            p.join(timeout=ATTESA_CHIUSURA)
+        print("\n== RISULTATO ==")
+        print("Sequenza Vincente:", seq)
+        print("Punteggio:", sc)
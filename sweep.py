@@ -0,0 +1,275 @@
+# ================================================================
+# Sweep di parametri di V3 su un pool di processi persistente
+#
+# Descrizione:
+# Per studiare lo scarto di due punti si lancia V3 molte volte, una per
+# ogni N e per ogni combinazione di regole (MISS_SET) e parametri di
+# ricerca (HC_ITERS, HC_MODO, ...). Qui la griglia
+#
+#   N x MISS_SET x parametri x semi
+#
+# viene espansa in job e tutti i job girano su un unico mp.Pool creato una
+# volta sola: i processi caricano V3 all'avvio e per ogni lavoro cambiano
+# solo regole e parametri (imposta_regole + setattr, i valutatori
+# compilati restano in cache nel processo). Con HC_CACHE ogni processo
+# tiene una sola CacheLRU dei punteggi, passata a hill_climb e ricreata
+# solo quando cambiano regole o dimensione.
+#
+# Job e blocchi:
+# Ogni job (una cella della griglia con un seme) ha un budget di restart,
+# diviso in blocchi di BLOCCO_RESTART restart con semi derivati dal seme
+# del job: la run è ripetibile qualunque sia il numero di processi. I
+# blocchi di tutti i job vanno al pool in ordine, con chunksize 1.
+#
+# Parametri:
+# Un job esegue solo hill_climb (o evolvi) di V3, non worker_search né
+# parallel_search: si accettano quindi solo i parametri letti da lì
+# (PARAMETRI). Gli altri (ISOLE, HC_TAVOLA, CHECKPOINT_*, METRICHE, ...)
+# verrebbero ignorati e sono rifiutati.
+#
+# Target ed early-stop per job:
+# Il target di ogni job è 2N(N+1) - 2 (B(N) - scarto, scarto = 2 di
+# default), ricavato dalle regole e non più scritto a mano in TARGET. Il
+# primo blocco che lo raggiunge alza il flag del suo job (memoria
+# condivisa): gli altri blocchi del job si fermano al restart successivo o
+# ritornano subito, e i processi passano ai blocchi del job dopo. Lo
+# stesso vale per il tempo massimo per job (--secondi), contato dal primo
+# blocco avviato.
+#
+# Risultati:
+# Una riga JSONL per job, scritta appena il suo ultimo blocco ritorna
+# (best, mazzo, target raggiunto, restart, valutazioni, secondi). I job già
+# presenti nel file di uscita vengono saltati: rilanciando lo stesso sweep
+# si riprende da dove si era interrotto.
+#
+# Uso:
+#   python sweep.py --n 5 6 7 --miss N-1 --semi 0-9 --out sweep.jsonl
+#   python sweep.py --n 7 --miss 4 6 --param HC_ITERS=2000,7500 --param HC_MODO=hill_climb,tabu
+#                   --restart 2000 --secondi 120 --procs 8
+# ================================================================
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import random
+import time
+from itertools import product
+from math import ceil
+
+from benchmark import carica_v3, intervallo
+from cache_zobrist import CacheLRU
+from regole import Regole
+
+BLOCCO_RESTART = 25     # restart per blocco (unità di lavoro del pool)
+
+# Parametri di V3 che hill_climb ed evolvi leggono a ogni chiamata
+PARAMETRI = ("HC_ITERS", "HC_BATCH", "HC_INCREMENTALE", "HC_GUIDATO", "P_FUOCO", "ULTIME_PRESE",
+             "HC_CACHE", "HC_MODO", "SECONDARIO", "SCHEDULA", "TEMP_INIZIALE", "TEMP_FINALE",
+             "TABU_VICINI", "TABU_DURATA", "GENETICO", "POP_SIZE", "TORNEO", "P_CROSSOVER",
+             "P_MUTAZIONE", "N_ELITE", "HC_FIGLI")
+
+
+# ==========================
+# GRIGLIA
+# ==========================
+
+def soglia_miss(testo):
+    # "4" -> 4; "N-1" -> N - 1 (relativa a N)
+    if testo.upper().startswith("N"):
+        return testo.upper()
+    return int(testo)
+
+
+def valori_param(testo):
+    # "HC_ITERS=2000,7500" -> ("HC_ITERS", [2000, 7500]); i valori sono JSON o stringhe
+    nome, _, valori = testo.partition("=")
+    if not valori:
+        raise argparse.ArgumentTypeError(f"atteso NOME=v1,v2,...: {testo}")
+    if nome.strip() not in PARAMETRI:
+        raise argparse.ArgumentTypeError(f"{nome.strip()} non è un parametro dello sweep "
+                                         f"(ammessi: {', '.join(PARAMETRI)})")
+
+    def valore(v):
+        try:
+            return json.loads(v)
+        except ValueError:
+            return v
+    return nome.strip(), [valore(v) for v in valori.split(",")]
+
+
+def espandi(valori_N, valori_miss, griglia, semi, scarto=2):
+    # Lista dei job: dizionari con N, miss_set, parametri, seme e target
+    nomi = [nome for nome, _ in griglia]
+    jobs = []
+    for N, miss, combo, seme in product(valori_N, valori_miss, product(*(v for _, v in griglia)), semi):
+        if isinstance(miss, str):
+            miss = N + int(miss[1:] or 0)
+        regole = Regole(N, 4, miss)
+        jobs.append({"N": N, "miss_set": miss, "parametri": dict(zip(nomi, combo)),
+                     "seme": seme, "target": regole.massimo - scarto})
+    return jobs
+
+
+def chiave(job):
+    return json.dumps([job["N"], job["miss_set"], job["parametri"], job["seme"], job["target"]])
+
+
+def gia_fatti(path):
+    # Chiavi dei job già scritti nel file di uscita
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return {chiave(json.loads(r)) for r in f if r.strip()}
+
+
+# ==========================
+# PROCESSI DEL POOL
+# ==========================
+
+_v3 = None           # modulo V3 caricato una volta per processo
+_predefiniti = {}    # parametri di V3 al caricamento
+_modificati = set()  # parametri cambiati dal lavoro precedente
+_stop = None         # flag di stop per job (memoria condivisa)
+_inizio = None       # istante di avvio del primo blocco di ogni job
+_cache = None        # cache dei punteggi del processo (HC_CACHE)
+_cache_chiave = None # (N, miss_set, HC_CACHE) per cui vale _cache
+
+
+def _inizializza(stop, inizio):
+    global _v3, _predefiniti, _stop, _inizio
+    _v3 = carica_v3()
+    _predefiniti = {k: v for k, v in vars(_v3).items() if k.isupper()}
+    _stop, _inizio = stop, inizio
+
+
+def _configura(N, miss_set, parametri):
+    # Parametri del job (gli altri tornano ai valori predefiniti) e poi regole
+    global _modificati
+    for nome in _modificati - parametri.keys():
+        setattr(_v3, nome, _predefiniti[nome])
+    for nome, valore in parametri.items():
+        if nome not in PARAMETRI:
+            raise ValueError(f"{nome} non è un parametro dello sweep (ammessi: {', '.join(PARAMETRI)})")
+        setattr(_v3, nome, valore)
+    _modificati = set(parametri)
+    _v3.imposta_regole(Regole(N, 4, miss_set))
+
+
+def _cache_punteggi(N, miss_set):
+    # CacheLRU del processo per le regole correnti (None se HC_CACHE = 0): i
+    # punteggi valgono per tutti i job con le stesse regole
+    global _cache, _cache_chiave
+    if not _v3.HC_CACHE:
+        return None
+    chiave = (N, miss_set, _v3.HC_CACHE)
+    if chiave != _cache_chiave:
+        _cache, _cache_chiave = CacheLRU(_v3.HC_CACHE), chiave
+    return _cache
+
+
+def esegui_blocco(args):
+    # Ritorna (j, best, mazzo, restart eseguiti, valutazioni, istante di fine)
+    j, b, restart, job, secondi = args
+    if _stop[j]:
+        return j, -1, None, 0, 0, time.time()
+    with _inizio.get_lock():
+        if _inizio[j] == 0.0:
+            _inizio[j] = time.time()
+    _configura(job["N"], job["miss_set"], job["parametri"])
+    v3, target = _v3, job["target"]
+    cache = _cache_punteggi(job["N"], job["miss_set"])
+    random.seed(f"{job['seme']}:{b}")
+    best, mazzo, fatti, valutazioni = -1, None, 0, 0
+    for _ in range(restart):
+        if _stop[j] or (secondi is not None and time.time() - _inizio[j] >= secondi):
+            break
+        if v3.GENETICO:
+            # Un "restart" genetico ha lo stesso budget di HC_ITERS passi di hill_climb
+            cand, sc, gen = v3.evolvi(v3.generazioni_per_budget(v3.HC_ITERS), target=target,
+                                      batch=v3.HC_BATCH)
+            valutazioni += v3.POP_SIZE + gen * v3.valutazioni_generazione()
+        else:
+            cand, sc = v3.hill_climb(v3.random_perm(v3.base), iters=v3.HC_ITERS, target=target,
+                                     batch=v3.HC_BATCH, cache=cache)
+            valutazioni += v3.HC_ITERS
+        fatti += 1
+        if sc > best:
+            best, mazzo = sc, cand
+        if sc >= target:
+            _stop[j] = 1
+            break
+    return j, best, mazzo, fatti, valutazioni, time.time()
+
+
+# ==========================
+# SWEEP
+# ==========================
+
+def sweep(jobs, out, restart=1000, secondi=None, n_procs=None):
+    # Esegue i job non ancora presenti in 'out'; ritorna i risultati di questa run
+    n_procs = n_procs or mp.cpu_count()
+    fatti = gia_fatti(out)
+    da_fare = [job for job in jobs if chiave(job) not in fatti]
+    if len(da_fare) < len(jobs):
+        print(f"[sweep] {len(jobs) - len(da_fare)} job già in {out}: saltati")
+    if not da_fare:
+        return []
+
+    n_blocchi = ceil(restart / BLOCCO_RESTART)
+    blocchi = [(j, b, min(BLOCCO_RESTART, restart - b * BLOCCO_RESTART), job, secondi)
+               for j, job in enumerate(da_fare) for b in range(n_blocchi)]
+    stop = mp.RawArray('b', len(da_fare))
+    inizio = mp.Array('d', len(da_fare))
+    stato = [{"best": -1, "mazzo": None, "restart": 0, "valutazioni": 0, "fine": 0.0,
+              "mancanti": n_blocchi} for _ in da_fare]
+    risultati = []
+    t0 = time.time()
+    with open(out, "a") as log, \
+            mp.Pool(n_procs, initializer=_inizializza, initargs=(stop, inizio)) as pool:
+        for j, best, mazzo, n, valutazioni, fine in pool.imap_unordered(esegui_blocco, blocchi, chunksize=1):
+            s = stato[j]
+            if best > s["best"]:
+                s["best"], s["mazzo"] = best, mazzo
+            s["restart"] += n
+            s["valutazioni"] += valutazioni
+            s["fine"] = max(s["fine"], fine)
+            s["mancanti"] -= 1
+            if s["mancanti"]:
+                continue
+            # Ultimo blocco del job: riga di risultato
+            job = da_fare[j]
+            r = dict(job, best=s["best"], mazzo=s["mazzo"], raggiunto=s["best"] >= job["target"],
+                     restart=s["restart"], valutazioni=s["valutazioni"],
+                     secondi=s["fine"] - inizio[j] if inizio[j] else 0.0)
+            log.write(json.dumps(r) + "\n")
+            log.flush()
+            risultati.append(r)
+            print(f"[{time.time() - t0:7.1f}s] N={job['N']} miss={job['miss_set']} {job['parametri']} "
+                  f"seme={job['seme']}: {r['best']}/{job['target']} restart={r['restart']} "
+                  f"t={r['secondi']:.1f}s ({len(risultati)}/{len(da_fare)})")
+    return risultati
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Sweep di parametri di V3 su un pool persistente")
+    ap.add_argument("--n", type=int, nargs="+", default=[5], help="valori di N")
+    ap.add_argument("--miss", type=soglia_miss, nargs="+", default=["N-1"],
+                    help="valori di MISS_SET, assoluti (4) o relativi a N (N-1)")
+    ap.add_argument("--param", type=valori_param, action="append", default=[],
+                    help="parametro di V3 con i suoi valori, es. HC_ITERS=2000,7500 (ripetibile); "
+                         "ammessi: " + ", ".join(PARAMETRI))
+    ap.add_argument("--semi", type=intervallo, default=intervallo("0-4"))
+    ap.add_argument("--restart", type=int, default=1000, help="restart per job")
+    ap.add_argument("--secondi", type=float, help="tempo massimo per job")
+    ap.add_argument("--scarto", type=int, default=2, help="target = 2N(N+1) - SCARTO")
+    ap.add_argument("--procs", type=int, help="processi del pool (default: tutti i core)")
+    ap.add_argument("--out", default="sweep.jsonl", help="risultati JSONL (una riga per job)")
+    args = ap.parse_args()
+
+    jobs = espandi(args.n, args.miss, args.param, args.semi, args.scarto)
+    t0 = time.time()
+    risultati = sweep(jobs, args.out, args.restart, args.secondi, args.procs)
+    raggiunti = sum(r["raggiunto"] for r in risultati)
+    print(f"{len(risultati)} job in {time.time() - t0:.1f}s, target raggiunto in {raggiunti}. "
+          f"Risultati in {args.out}")
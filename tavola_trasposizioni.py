@@ -0,0 +1,200 @@
+# ================================================================
+# Analisi esatta con tavola di trasposizione sugli stati del mazzo
+#
+# Descrizione:
+# Dopo ogni presa gioca() riparte a contare dalla posizione 0 del mazzo
+# rimasto (già ruotato da riordina): lo stato della partita fra due prese
+# è quindi solo la tupla delle carte rimaste, e da lì il resto della
+# partita (punti ancora da fare e carte che restano alla fine) è
+# determinato. Mazzi iniziali diversi arrivano spesso agli stessi stati
+# intermedi (soprattutto ai finali corti), e gioca() rigioca ogni volta lo
+# stesso pezzo di partita.
+#
+# Tavola:
+# TavolaTrasposizioni tiene stato -> (punti da qui alla fine, carte
+# rimaste a fine partita), limitata a 'capacita' voci con espulsione LRU.
+# gioca() e gioca_finale() hanno firma e risultato dei valutatori di
+# regole.py, quindi la tavola può prendere il loro posto in V3.
+# valuta(p) gioca presa per presa e si ferma al primo stato già in
+# tavola; poi, a ritroso, registra gli stati attraversati. Si cercano e si
+# registrano solo il mazzo iniziale (l'hill climbing torna spesso sugli
+# stessi mazzi) e gli stati fino a lunghezza_max carte: quelli lunghi non
+# si ripetono quasi mai e cercarli costa più di quanto fanno risparmiare.
+# Le chiavi sono le tuple stesse: nessuna collisione.
+#
+# L'esito da uno stato dipende solo da soglia di mancate e rotazione (le
+# carte > N non esistono), quindi una tavola si può riusare fra restart,
+# fra passi di hill_climb e, salvata su disco, fra run diverse con le
+# stesse regole.
+#
+# File:
+# Intestazione "<4sHBI" (magic TTRS, miss_set, rotazione, numero di voci),
+# poi per ogni voce "<BHB" (carte dello stato, punti, carte rimaste) +
+# stato e carte rimaste a 4 bit (impacca di mazzo_compatto). Scrittura
+# atomica (file temporaneo + rename).
+#
+# Uso (hit-rate su un carico stile V3: restart casuali + hill_climb):
+#   python tavola_trasposizioni.py 8 --restart 200 --hc-iters 2000 --salva t8.ttrs
+#   python tavola_trasposizioni.py 8 --restart 200 --carica t8.ttrs
+# ================================================================
+
+import argparse
+import os
+import random
+import struct
+import time
+from collections import OrderedDict
+
+from archivio_elite import _scrivi_atomico
+from mazzo_compatto import impacca, spacchetta
+from regole import Regole, valutatore
+
+MAGIC = b"TTRS"
+INTESTAZIONE = struct.Struct("<4sHBI")     # magic, miss_set, rotazione, voci
+VOCE = struct.Struct("<BHB")               # carte dello stato, punti, carte rimaste
+LUNGHEZZA_MAX = 12      # stati intermedi più lunghi non vengono cercati né registrati
+
+
+class TavolaTrasposizioni:
+
+    def __init__(self, regole, capacita=1_000_000, lunghezza_max=LUNGHEZZA_MAX):
+        self.regole = regole
+        self.capacita = capacita
+        self.lunghezza_max = lunghezza_max
+        self.W = regole.miss_set + 1
+        self.dati = OrderedDict()
+        self.hit = 0                # stati trovati in tavola
+        self.miss = 0               # stati cercati e non trovati
+        self.valutazioni = 0
+        self.risolte = 0            # valutazioni fermate da uno stato in tavola
+
+    def valuta(self, p):
+        # (punteggio, tupla delle carte rimaste a fine partita) del mazzo p
+        self.valutazioni += 1
+        dati, W, rotazione, corti = self.dati, self.W, self.regole.rotazione, self.lunghezza_max
+        t = tuple(p)
+        percorso = []               # (stato, punti fatti prima di arrivarci)
+        punti = 0
+        while True:
+            # Si cercano il mazzo iniziale e gli stati corti (quelli lunghi non si ripetono)
+            if not percorso or len(t) <= corti:
+                esito = dati.get(t)
+                if esito is not None:
+                    dati.move_to_end(t)
+                    self.hit += 1
+                    self.risolte += 1
+                    break
+                self.miss += 1
+                percorso.append((t, punti))
+            for k in range(min(len(t), W)):
+                if t[k] == k + 1:
+                    break
+            else:
+                esito = (0, t)
+                break
+            punti += k + 1
+            t = t[k + 1:] + t[:k] if rotazione else t[:k] + t[k + 1:]
+        # A ritroso: ogni stato attraversato vale (punti finali - punti fatti prima)
+        totale, rimaste = punti + esito[0], esito[1]
+        for stato, prima in percorso:
+            dati[stato] = (totale - prima, rimaste)
+        while len(dati) > self.capacita:
+            dati.popitem(last=False)
+        return totale, rimaste
+
+    def gioca(self, p):
+        # Stessa firma e stesso risultato di gioca() di V3
+        return self.valuta(p)[0]
+
+    def gioca_finale(self, p):
+        # Come valutatore(regole, finale=True): (punteggio, lista delle carte rimaste)
+        punti, rimaste = self.valuta(p)
+        return punti, list(rimaste)
+
+    def statistiche(self):
+        tot = self.hit + self.miss
+        return {"hit": self.hit, "miss": self.miss, "hit_rate": self.hit / tot if tot else 0.0,
+                "valutazioni": self.valutazioni,
+                "risolte": self.risolte / self.valutazioni if self.valutazioni else 0.0,
+                "voci": len(self.dati)}
+
+    def salva(self, path):
+        parti = [INTESTAZIONE.pack(MAGIC, self.regole.miss_set, self.regole.rotazione, len(self.dati))]
+        for stato, (punti, rimaste) in self.dati.items():
+            parti.append(VOCE.pack(len(stato), punti, len(rimaste)) + impacca(stato) + impacca(rimaste))
+        _scrivi_atomico(path, b"".join(parti))
+
+    def carica(self, path):
+        # Aggiunge le voci salvate in 'path' (se esiste); le regole devono coincidere
+        if not os.path.exists(path):
+            return 0
+        with open(path, "rb") as f:
+            dati = f.read()
+        magic, miss_set, rotazione, n = INTESTAZIONE.unpack_from(dati)
+        if magic != MAGIC:
+            raise ValueError(f"{path} non è una tavola di trasposizione")
+        if (miss_set, bool(rotazione)) != (self.regole.miss_set, self.regole.rotazione):
+            raise ValueError(f"{path} è per miss_set={miss_set}, rotazione={bool(rotazione)}")
+        pos = INTESTAZIONE.size
+        for _ in range(n):
+            L, punti, R = VOCE.unpack_from(dati, pos)
+            pos += VOCE.size
+            stato = tuple(spacchetta(dati[pos:pos + (L + 1) // 2], L))
+            pos += (L + 1) // 2
+            rimaste = tuple(spacchetta(dati[pos:pos + (R + 1) // 2], R))
+            pos += (R + 1) // 2
+            self.dati[stato] = (punti, rimaste)
+        while len(self.dati) > self.capacita:
+            self.dati.popitem(last=False)
+        return n
+
+
+def carico_v3(gioca, regole, restart, hc_iters, seme=0):
+    # Restart casuali + hill_climb semplice di V3 (gioca() sostituito): ritorna il best
+    from benchmark import carica_v3, configura_v3
+    v3 = configura_v3(carica_v3(), regole.N, regole.miss_set, hc_iters=hc_iters)
+    v3.HC_INCREMENTALE = False
+    v3.gioca_compilato = gioca
+    random.seed(seme)
+    best = -1
+    for _ in range(restart):
+        _, sc = v3.hill_climb(v3.random_perm(v3.base), iters=hc_iters, target=v3.TARGET)
+        best = max(best, sc)
+    return best
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Tavola di trasposizione: hit-rate su un carico stile V3")
+    ap.add_argument("N", type=int)
+    ap.add_argument("--miss", type=int, help="MISS_SET (default N - 1)")
+    ap.add_argument("--restart", type=int, default=100)
+    ap.add_argument("--hc-iters", type=int, default=2000)
+    ap.add_argument("--capacita", type=int, default=1_000_000, help="voci massime della tavola")
+    ap.add_argument("--lunghezza-max", type=int, default=LUNGHEZZA_MAX,
+                    help="stati intermedi più lunghi non vengono cercati né registrati")
+    ap.add_argument("--seme", type=int, default=0)
+    ap.add_argument("--carica", help="tavola salvata da cui partire")
+    ap.add_argument("--salva", help="file in cui salvare la tavola a fine run")
+    ap.add_argument("--confronta", action="store_true",
+                    help="rigioca lo stesso carico col valutatore compilato (stesso best, tempi a confronto)")
+    args = ap.parse_args()
+
+    regole = Regole(args.N, 4, args.miss if args.miss is not None else args.N - 1)
+    tavola = TavolaTrasposizioni(regole, args.capacita, args.lunghezza_max)
+    if args.carica:
+        print(f"Caricate {tavola.carica(args.carica):,} voci da {args.carica}")
+    t0 = time.perf_counter()
+    best = carico_v3(tavola.gioca, regole, args.restart, args.hc_iters, args.seme)
+    dt = time.perf_counter() - t0
+    st = tavola.statistiche()
+    print(f"N = {args.N}, MISS_SET = {regole.miss_set}: best {best}, {st['valutazioni']:,} valutazioni "
+          f"in {dt:.2f}s ({st['valutazioni'] / dt:,.0f}/s)")
+    print(f"Stati: hit-rate {st['hit_rate']:.1%} ({st['hit']:,} hit, {st['miss']:,} miss); "
+          f"valutazioni fermate dalla tavola {st['risolte']:.1%}; voci {st['voci']:,}")
+    if args.confronta:
+        t0 = time.perf_counter()
+        best_c = carico_v3(valutatore(regole), regole, args.restart, args.hc_iters, args.seme)
+        print(f"Valutatore compilato: best {best_c}, {time.perf_counter() - t0:.2f}s")
+    if args.salva:
+        tavola.salva(args.salva)
+        print(f"Tavola salvata in {args.salva}")
@@ -0,0 +1,115 @@
+# ================================================================
+# Valutazione incrementale per l'hill climbing
+#
+# Descrizione:
+# Nell'hill climbing ogni candidato differisce dalla sequenza migliore
+# corrente solo in poche posizioni (swap_local, block_move_local), ma
+# gioca() rigioca ogni volta l'intera partita. Questo valutatore tiene,
+# per la sequenza corrente, un checkpoint dello stato di gioco all'inizio
+# di ogni presa e, per ogni posizione del mazzo iniziale, la presa durante
+# la quale quella carta è stata letta per la prima volta.
+#
+# Per un candidato la partita è identica a quella della sequenza corrente
+# finché non viene letta una posizione modificata: si riparte quindi dal
+# checkpoint della prima presa che legge una posizione cambiata. Se
+# nessuna posizione modificata viene mai letta, il punteggio è lo stesso
+# e non serve simulare nulla.
+#
+# Stato salvato:
+# All'inizio di ogni presa l'indice è sempre 0 (offset nullo) e il
+# contatore di mancate è 0, quindi un checkpoint è la coppia
+# (posizioni originali ancora nel mazzo, in ordine logico; punteggio).
+#
+# Regole:
+# miss_set e rotazione sono quelli di Regole (regole.py): con rotazione
+# il mazzo dopo la presa in k è arr[k+1:] + arr[:k], senza è arr[:k] +
+# arr[k+1:]. V3 li passa da REGOLE.
+# ================================================================
+
+MAI = 1 << 30   # "mai letta": più grande di qualunque numero di prese
+
+
+class ValutatoreIncrementale:
+
+    def __init__(self, seq, miss_set=4, rotazione=True):
+        self.miss_set = miss_set
+        self.rotazione = rotazione
+        self.imposta(seq)
+
+    def imposta(self, seq):
+        # Registra 'seq' come nuova sequenza corrente giocando la partita completa.
+        self.seq = tuple(seq)
+        self.prima_lettura = [MAI] * len(self.seq)
+        self.checkpoint = [(tuple(range(len(self.seq))), 0)]
+        return self._registra(0)
+
+    def primo_step(self, cand):
+        # Prima presa della partita corrente che legge una posizione dove
+        # 'cand' differisce da 'seq' (MAI se nessuna di esse viene letta).
+        prima = self.prima_lettura
+        return min([prima[p] for p, (a, b) in enumerate(zip(cand, self.seq)) if a != b],
+                   default=MAI)
+
+    def valuta(self, cand):
+        # Punteggio di 'cand' ripartendo dall'ultimo checkpoint valido.
+        step = self.primo_step(cand)
+        if step == MAI:
+            return self.punteggio       # nessuna carta modificata viene mai letta
+        pos, punt = self.checkpoint[step]
+        arr = [cand[p] for p in pos]
+        return self._continua(arr, punt)
+
+    def accetta(self, cand):
+        # Come imposta(cand), ma conserva i checkpoint e le prime letture
+        # delle prese precedenti alla divergenza.
+        step = self.primo_step(cand)
+        self.seq = tuple(cand)
+        if step == MAI:
+            return self.punteggio       # stessa traiettoria: cambiano solo carte mai lette
+        del self.checkpoint[step + 1:]
+        prima = self.prima_lettura
+        for p in range(len(prima)):
+            if prima[p] >= step:
+                prima[p] = MAI
+        return self._registra(step)
+
+    def _registra(self, step):
+        # Gioca da checkpoint[step] seguendo le posizioni originali delle carte,
+        # annotando prime letture e checkpoint delle prese successive.
+        seq = self.seq
+        prima = self.prima_lettura
+        W = self.miss_set + 1
+        pos, punt = self.checkpoint[step]
+
+        while pos:
+            # Fra due prese gioca() legge solo le posizioni 0..min(n, W)-1
+            # (oltre, la scansione circolare ripete carte già lette)
+            for k in range(min(len(pos), W)):
+                p = pos[k]
+                if prima[p] == MAI:
+                    prima[p] = step
+                if seq[p] == k + 1:
+                    break
+            else:
+                break
+            punt += k + 1
+            # del + riordina in un'unica operazione
+            pos = pos[k + 1:] + pos[:k] if self.rotazione else pos[:k] + pos[k + 1:]
+            step += 1
+            self.checkpoint.append((pos, punt))
+
+        self.punteggio = punt
+        return punt
+
+    def _continua(self, arr, punt):
+        # Stesso risultato di gioca(), a partire da uno stato con i = 0 e miss = 0
+        W, rotazione = self.miss_set + 1, self.rotazione
+        while arr:
+            for k in range(min(len(arr), W)):
+                if arr[k] == k + 1:
+                    break
+            else:
+                break
+            punt += k + 1
+            arr = arr[k + 1:] + arr[:k] if rotazione else arr[:k] + arr[k + 1:]
+        return punt
@@ -0,0 +1,187 @@
+# ================================================================
+# Verifica in blocco di mazzi candidati (con il gioca() di Tester.py)
+#
+# Descrizione:
+# Tester.py verifica a mano un solo mazzo. Qui i mazzi arrivano da file,
+# anche a milioni, e vengono rigiocati con lo stesso valutatore di Tester.py
+# (compila(), l'unica definizione usata come riferimento, compilato una
+# volta per N in ogni blocco), a blocchi in parallelo.
+#
+# Formati:
+# - testo: un mazzo per riga. Si prende il gruppo fra parentesi tonde o
+#   quadre più lungo (così vanno bene sia "3, 2, 1, ..." sia le righe
+#   "Sequenza vincente: (3, 2, ...)  Punteggio: 58" stampate dagli
+#   script); righe vuote o senza numeri vengono saltate. In uscita:
+#   "punteggio (c1, c2, ...)".
+# - binario: l'archivio append-only di mazzo_compatto.py (.mzpk, 4 bit
+#   per carta + punteggio). In ingresso il punteggio salvato viene
+#   confrontato con quello rigiocato (discordanze contate a parte).
+#   Un .mzpk ha una sola lunghezza di mazzo: in uscita tutti i mazzi
+#   tenuti devono avere lo stesso N (altrimenti ValueError; per N misti
+#   si usa l'uscita testo).
+# Il formato si deduce dall'estensione (.mzpk = binario); "-" è
+# stdin/stdout in formato testo.
+#
+# Filtri:
+# - --soglia S : tiene i mazzi con punteggio >= S;
+# - --finale2  : tiene i mazzi la cui partita termina con la sola carta 2,
+#   cioè punteggio == somma delle carte - 2 (un residuo di somma 2 non
+#   può essere (1, 1): un 1 in prima posizione viene sempre preso).
+# Ogni mazzo deve inoltre essere una permutazione di {1^4, ..., N^4}
+# (N = carta più alta): gli altri vengono contati come non validi.
+#
+# Streaming:
+# L'ingresso viene letto a blocchi e al pool non ci sono mai più di
+# 2 x processi blocchi in volo; i risultati escono nell'ordine di
+# ingresso man mano che i blocchi finiscono.
+#
+# Uso:
+#   python verifica_mazzi.py candidati.txt verificati.txt --finale2
+#   python verifica_mazzi.py risultati.mzpk top.mzpk --soglia 58 --procs 8
+# ================================================================
+
+import argparse
+import multiprocessing as mp
+import os
+import re
+import sys
+import time
+from collections import Counter, deque
+from itertools import islice
+
+from mazzo_compatto import LettoreMazzi, ScrittoreMazzi
+from Tester import compila
+
+GRUPPO = re.compile(r"[\(\[]([^\)\]]*)[\)\]]")
+NUMERO = re.compile(r"\d+")
+
+
+def leggi_riga(riga):
+    # Mazzo di una riga di testo (tupla, eventualmente vuota)
+    gruppi = GRUPPO.findall(riga)
+    testo = max(gruppi, key=len) if gruppi else riga
+    return tuple(int(x) for x in NUMERO.findall(testo))
+
+
+def leggi_mazzi(path):
+    # Coppie (punteggio salvato o None, mazzo), lette una alla volta
+    if path.endswith(".mzpk"):
+        lettore = LettoreMazzi(path)
+        try:
+            yield from lettore
+        finally:
+            lettore.chiudi()
+        return
+    f = sys.stdin if path == "-" else open(path)
+    try:
+        for riga in f:
+            mazzo = leggi_riga(riga)
+            if mazzo:
+                yield None, mazzo
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def valido(mazzo):
+    # Permutazione di {1^4, ..., N^4}
+    c = Counter(mazzo)
+    return len(mazzo) % 4 == 0 and all(c[v] == 4 for v in range(1, len(mazzo) // 4 + 1))
+
+
+def verifica_blocco(blocco, miss_set, soglia, finale2):
+    # Ritorna (mazzi tenuti come (punteggio, mazzo), statistiche del blocco)
+    tenuti = []
+    stat = Counter()
+    valutatori = {}                     # N -> gioca() compilato, una volta per blocco
+    for salvato, mazzo in blocco:
+        stat["letti"] += 1
+        if not valido(mazzo):
+            stat["non validi"] += 1
+            continue
+        N = len(mazzo) // 4
+        if N not in valutatori:
+            valutatori[N] = compila(N, miss_set)
+        sc = valutatori[N](mazzo)
+        if salvato is not None and salvato != sc:
+            stat["discordanti"] += 1
+        if finale2:
+            stat["finale (2)"] += sc == sum(mazzo) - 2
+        if (soglia is None or sc >= soglia) and (not finale2 or sc == sum(mazzo) - 2):
+            tenuti.append((sc, mazzo))
+    stat["tenuti"] += len(tenuti)
+    return tenuti, stat
+
+
+class Uscita:
+
+    def __init__(self, path):
+        self.path = path
+        self.binario = path.endswith(".mzpk")
+        self.scrittore = None
+        if self.binario and os.path.exists(path):
+            os.remove(path)             # si riscrive da capo, come per il testo
+        self.f = None if self.binario else (sys.stdout if path == "-" else open(path, "w"))
+
+    def scrivi(self, tenuti):
+        if not tenuti:
+            return
+        if self.binario:
+            if self.scrittore is None:
+                self.scrittore = ScrittoreMazzi(self.path, len(tenuti[0][1]))
+            diversi = {len(mazzo) for _, mazzo in tenuti} - {self.scrittore.L}
+            if diversi:
+                raise ValueError(f"{self.path}: un .mzpk contiene mazzi di una sola lunghezza "
+                                 f"({self.scrittore.L} carte), trovati anche mazzi da "
+                                 f"{sorted(diversi)} carte: usare un'uscita testo")
+            self.scrittore.aggiungi_molti(tenuti)
+        else:
+            self.f.writelines(f"{sc} {mazzo}\n" for sc, mazzo in tenuti)
+
+    def chiudi(self):
+        if self.scrittore is not None:
+            self.scrittore.chiudi()
+        if self.f is not None and self.f is not sys.stdout:
+            self.f.close()
+
+
+def verifica(ingresso, uscita, miss_set=4, soglia=None, finale2=False, n_procs=None, blocco=10_000):
+    n_procs = n_procs or mp.cpu_count()
+    mazzi = leggi_mazzi(ingresso)
+    out = Uscita(uscita)
+    stat = Counter()
+    in_volo = deque()
+    try:
+        with mp.Pool(n_procs) as pool:
+            while True:
+                pezzo = list(islice(mazzi, blocco))
+                if pezzo:
+                    in_volo.append(pool.apply_async(verifica_blocco, (pezzo, miss_set, soglia, finale2)))
+                # Si scrive appena il blocco più vecchio è pronto (o se ce ne sono troppi in volo)
+                while in_volo and (not pezzo or len(in_volo) >= 2 * n_procs or in_volo[0].ready()):
+                    tenuti, s = in_volo.popleft().get()
+                    out.scrivi(tenuti)
+                    stat.update(s)
+                if not pezzo:
+                    break
+    finally:
+        out.chiudi()
+    return stat
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Verifica in blocco di mazzi con il gioca() di Tester.py")
+    ap.add_argument("ingresso", help="file di mazzi (testo, .mzpk, oppure - per stdin)")
+    ap.add_argument("uscita", help="file dei mazzi verificati (testo, .mzpk, oppure - per stdout)")
+    ap.add_argument("--miss", type=int, default=4, help="MISS_SET (default 4, come Tester.py)")
+    ap.add_argument("--soglia", type=int, help="tiene solo i mazzi con punteggio >= SOGLIA")
+    ap.add_argument("--finale2", action="store_true", help="tiene solo i mazzi che finiscono con la sola carta 2")
+    ap.add_argument("--procs", type=int, help="processi (default: tutti i core)")
+    ap.add_argument("--blocco", type=int, default=10_000, help="mazzi per blocco")
+    args = ap.parse_args()
+
+    t0 = time.time()
+    stat = verifica(args.ingresso, args.uscita, args.miss, args.soglia, args.finale2, args.procs, args.blocco)
+    dt = time.time() - t0
+    riepilogo = "  ".join(f"{k}: {v}" for k, v in sorted(stat.items()))
+    print(f"{riepilogo}  tempo: {dt:.1f}s ({stat['letti'] / dt:,.0f} mazzi/s)", file=sys.stderr)